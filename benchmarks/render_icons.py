@@ -0,0 +1,126 @@
+"""Micro-benchmark of Stream Deck icon rendering.
+
+Compares the per-render cost of the previous indented f-string templates, chosen
+through nested ifs, with the render functions of `custom_components/streamdeck/icons.py`.
+
+Usage: python benchmarks/render_icons.py [number]
+"""
+from __future__ import annotations
+
+import importlib.util
+from pathlib import Path
+import sys
+import timeit
+
+ICONS_PATH = Path(__file__).parent.parent / "custom_components/streamdeck/icons.py"
+
+# Load the icon module without importing the integration (needs Home Assistant)
+_spec = importlib.util.spec_from_file_location("streamdeck_icons", ICONS_PATH)
+icons = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(icons)
+
+ENTITY, PLUS, MINUS = "entity", "plus", "minus"
+
+MDI = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100" '
+    'viewBox="0 0 24 24"><path fill="#ffc107" d="M12,2A7,7 0 0,0 5,9C5,11.38 '
+    "6.19,13.47 8,14.74V17A1,1 0 0,0 9,18H15A1,1 0 0,0 16,17V14.74C17.81,13.47 "
+    '19,11.38 19,9A7,7 0 0,0 12,2M9,21A1,1 0 0,0 10,22H14A1,1 0 0,0 15,21V20H9V21Z" />'
+    "</svg>"
+)
+
+TEMPLATES = {
+    (ENTITY, True): icons.render_entity_named,
+    (PLUS, True): icons.render_plus_named,
+    (MINUS, True): icons.render_minus_named,
+    (ENTITY, False): icons.render_entity,
+    (PLUS, False): icons.render_plus,
+    (MINUS, False): icons.render_minus,
+}
+
+
+def render_before(button_type, show_name, modifier_color, name, state_text, mdi):
+    """Render icon like update_icon did with inline f-strings."""
+    svg = ""
+    if show_name is True:
+        if button_type == PLUS:
+            svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
+                    <rect width="72" height="72" fill="#000" />
+                    <rect x="40" y="12" width="25" height="25" fill="{modifier_color}" rx="5" />
+                    <rect x="45" y="22" width="15" height="5" fill="#000" />
+                    <rect x="50" y="17" width="5" height="15" fill="#000" />
+                    <text text-anchor="middle" x="35" y="65" fill="#fff" font-size="12">{name}</text>
+                    <g transform="translate(14, 14) scale(0.5)">{mdi}</g>
+                    </svg>"""
+        elif button_type == MINUS:
+            svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
+                    <rect width="72" height="72" fill="#000" />
+                    <rect x="40" y="12" width="25" height="25" fill="{modifier_color}" rx="5" />
+                    <rect x="45" y="22" width="15" height="5" fill="#000" />
+                    <text text-anchor="middle" x="35" y="65" fill="#fff" font-size="12">{name}</text>
+                    <g transform="translate(14, 14) scale(0.5)">{mdi}</g>
+                    </svg>"""
+        elif button_type == ENTITY:
+            svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
+                    <rect width="72" height="72" fill="#000" />
+                    <text text-anchor="middle" x="35" y="15" fill="#fff" font-size="12">{state_text}</text>
+                    <text text-anchor="middle" x="35" y="65" fill="#fff" font-size="12">{name}</text>
+                    <g transform="translate(16, 12) scale(0.5)">{mdi}</g>
+                    </svg>"""
+    else:
+        if button_type == PLUS:
+            svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
+                    <rect width="72" height="72" fill="#000" />
+                    <rect x="40" y="12" width="25" height="25" fill="{modifier_color}" rx="5" />
+                    <rect x="45" y="22" width="15" height="5" fill="#000" />
+                    <rect x="50" y="17" width="5" height="15" fill="#000" />
+                    <g transform="translate(10, 10) scale(0.7)">{mdi}</g>
+                    </svg>"""
+        elif button_type == MINUS:
+            svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
+                    <rect width="72" height="72" fill="#000" />
+                    <rect x="40" y="12" width="25" height="25" fill="{modifier_color}" rx="5" />
+                    <rect x="45" y="22" width="15" height="5" fill="#000" />
+                    <g transform="translate(10, 10) scale(0.7)">{mdi}</g>
+                    </svg>"""
+        elif button_type == ENTITY:
+            svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
+                    <rect width="72" height="72" fill="#000" />
+                    <g transform="translate(5, 0) scale(0.8)">{mdi}</g>
+                    </svg>"""
+    return svg
+
+
+def render_after(button_type, show_name, modifier_color, name, state_text, mdi):
+    """Render icon like update_icon does with the icon layout table."""
+    render = TEMPLATES[(button_type, show_name)]
+    if render is icons.render_entity_named:
+        return render(state_text, name, mdi)
+    if render is icons.render_entity:
+        return render(mdi)
+    if show_name:
+        return render(modifier_color, name, mdi)
+    return render(modifier_color, mdi)
+
+
+def main(number: int) -> None:
+    """Run benchmark for all layouts."""
+    print(f"{'layout':<16}{'before':>12}{'after':>12}{'bytes':>16}")
+    for button_type, show_name in TEMPLATES:
+        args = (button_type, show_name, "#ffc107", "Living Room", "42%", MDI)
+        results = []
+        for render in (render_before, render_after):
+            timer = timeit.Timer(lambda render=render: render(*args))
+            best = min(timer.repeat(repeat=5, number=number))
+            results.append(best / number * 1e9)
+        size_before = len(render_before(*args))
+        size_after = len(render_after(*args))
+        layout = f"{button_type}{'+name' if show_name else ''}"
+        print(
+            f"{layout:<16}{results[0]:>9.0f} ns{results[1]:>9.0f} ns"
+            f"{size_before:>8} -> {size_after:<5}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
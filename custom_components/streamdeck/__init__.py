@@ -2,12 +2,24 @@
 from __future__ import annotations
 
 import asyncio
+from collections import Counter, deque
+from collections.abc import Callable
+from datetime import timedelta
 from enum import Enum
+from functools import lru_cache, partial
 import logging
 import re
+import time
 
+from aiohttp import ClientError, ClientTimeout
 from mdiicons import MDI
-from streamdeckapi import SDWebsocketMessage, StreamDeckApi
+from streamdeckapi import (
+    PLUGIN_ICON,
+    PLUGIN_PORT,
+    SDInfo,
+    SDWebsocketMessage,
+    StreamDeckApi,
+)
 import voluptuous as vol
 
 from homeassistant.components import climate
@@ -19,10 +31,12 @@ from homeassistant.components.media_player import (
     STATE_PLAYING,
 )
 from homeassistant.components.select import SelectEntity
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     ATTR_DEVICE_ID,
     ATTR_ENTITY_ID,
+    ATTR_ICON,
     ATTR_TEMPERATURE,
     ATTR_UNIT_OF_MEASUREMENT,
     CONF_BRIGHTNESS,
@@ -32,7 +46,6 @@ from homeassistant.const import (
     CONF_MODEL,
     CONF_NAME,
     CONF_UNIQUE_ID,
-    EVENT_STATE_CHANGED,
     SERVICE_TOGGLE,
     SERVICE_TURN_ON,
     SERVICE_VOLUME_SET,
@@ -41,14 +54,45 @@ from homeassistant.const import (
     STATE_UNAVAILABLE,
     Platform,
 )
-from homeassistant.core import Event, HomeAssistant, ServiceCall, State
-from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.entity import DeviceInfo
-from homeassistant.helpers.typing import ConfigType
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    Event,
+    HomeAssistant,
+    ServiceCall,
+    State,
+    callback,
+)
+from homeassistant.exceptions import ConfigEntryNotReady, HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
+from homeassistant.helpers.event import (
+    async_call_later,
+    async_track_state_added_domain,
+    async_track_state_change_event,
+    async_track_state_removed_domain,
+    async_track_time_interval,
+)
+from homeassistant.helpers.storage import STORAGE_DIR
+from homeassistant.helpers.typing import ConfigType, StateType
 
+from . import icons
 from .const import (
+    ADJUST_MEMORY,
+    ADJUST_WINDOW,
+    ATTR_AVAILABLE,
+    ATTR_CALLS,
+    ATTR_DECKS,
+    ATTR_DURATION,
+    ATTR_ENTRY_ID,
+    ATTR_FILE,
+    ATTR_FUNCTIONS,
+    ATTR_LATENCY,
     ATTR_POSITION,
+    ATTR_TOP,
     ATTR_UUID,
+    BUTTONS_SAVE_DELAY,
     CLIMATE_UP_DOWN_STEPS,
     COLOR_ACTIVE,
     COLOR_INACTIVE,
@@ -58,30 +102,88 @@ from .const import (
     COLOR_UNAVAILABLE,
     CONF_BUTTONS,
     CONF_ENABLED_PLATFORMS,
+    CONF_LAST_INFO,
+    CONF_OPTIMISTIC,
+    CONF_RASTERIZE,
+    CONF_REPEAT_RATE,
     CONF_SHOW_NAME,
     CONF_VERSION,
+    DATA_ADJUSTMENTS,
     DATA_API,
+    DATA_BUTTONS,
     DATA_CURRENT_ENTITY,
+    DATA_DOMAIN_UNSUB,
+    DATA_ENTITY_INDEX,
+    DATA_HOLDS,
+    DATA_ICON_SCHEDULER,
+    DATA_INFO,
+    DATA_MODIFIER_BUTTONS,
+    DATA_OPTIMISTIC,
+    DATA_RASTERIZER,
+    DATA_SAVE_UNSUB,
+    DATA_SELECT_DEBOUNCER,
     DATA_SELECT_ENTITIES,
+    DATA_SELECT_OPTIONS,
+    DATA_STATS,
+    DATA_STATE_UNSUB,
+    DATA_SYNC_TASK,
+    DATA_TRACKED_ENTITIES,
+    DATA_TRACKED_PLATFORMS,
     DEFAULT_ICONS,
+    DEFAULT_OPTIMISTIC,
     DEFAULT_PLATFORMS,
+    DEFAULT_RASTERIZE,
+    DEFAULT_REPEAT_RATE,
     DOMAIN,
+    EVENT_KEY_DOWN,
+    EVENT_KEY_UP,
     EVENT_LONG_PRESS,
     EVENT_SHORT_PRESS,
+    HISTOGRAM_BUCKETS,
+    HOLD_DELAY,
+    HOLD_STEP_INTERVAL,
+    ICON_FLUSH_INTERVAL,
+    ICON_MAX_IN_FLIGHT,
+    ICON_UPLOAD_TIMEOUT,
+    INFO_MAX_AGE,
+    INFO_TIMEOUT,
+    KEY_SIZE_DEFAULT,
+    KEY_SIZES,
+    KEY_SIZES_BY_NAME,
     LIGHT_UP_DOWN_STEPS,
     MANUFACTURER,
+    MDI_CACHE_SIZE,
     MDI_DEFAULT,
     MDI_PREFIX,
+    OPTIMISTIC_TIMEOUT,
+    PROFILE_DEFAULT_DURATION,
+    PROFILE_DEFAULT_TOP,
+    PROFILE_MAX_DURATION,
+    RASTER_CACHE_DIR,
     SELECT_DEFAULT_OPTIONS,
     SELECT_OPTION_DOWN,
     SELECT_OPTION_UP,
+    SELECT_OPTIONS_COOLDOWN,
+    SENSOR_UPDATE_INTERVAL,
+    STAT_ICONS_PUSHED,
+    STAT_ICONS_RENDERED,
+    STAT_INFO_TIME,
+    STAT_PRESS_LATENCY,
+    STAT_RENDER_TIME,
+    STAT_STATE_EVENTS,
+    STAT_STATE_EVENTS_SKIPPED,
+    STAT_UPLOAD_TIME,
+    STAT_WS_CONNECTS,
+    STATS_MAX_SAMPLES,
     TOGGLEABLE_PLATFORMS,
     UP_DOWN_PLATFORMS,
     VOLUME_UP_DOWN_STEPS,
 )
+from .profiling import profiled, start_session, stop_session
+from .raster import IconRasterizer
 
 _LOGGER = logging.getLogger(__name__)
-PLATFORMS: list[Platform] = [Platform.SELECT]
+PLATFORMS: list[Platform] = [Platform.SELECT, Platform.SENSOR]
 
 
 def setup(hass: HomeAssistant, config: ConfigType) -> bool:
@@ -89,17 +191,39 @@ def setup(hass: HomeAssistant, config: ConfigType) -> bool:
 
     async def sevice_sdinfo(call: ServiceCall) -> None:
         """Handle Service sdinfo."""
-        entries: list[ConfigEntry] = hass.config_entries.async_entries(DOMAIN)
-        for entry in entries:
-            _LOGGER.info(entry.entry_id)
-            api: StreamDeckApi = hass.data[DOMAIN][entry.entry_id][DATA_API]
-            if not isinstance(api, StreamDeckApi):
-                return
-            info = await api.get_info()
-            if info is not None:
-                hass.bus.async_fire(
-                    f"{DOMAIN}_status", {CONF_HOST: api.host, CONF_EVENT_DATA: info}
-                )
+        results = await async_query_decks(hass)
+        hass.bus.async_fire(
+            f"{DOMAIN}_status",
+            {
+                ATTR_DECKS: [
+                    {
+                        ATTR_ENTRY_ID: result[ATTR_ENTRY_ID],
+                        CONF_HOST: result[CONF_HOST],
+                        CONF_EVENT_DATA: result[CONF_EVENT_DATA],
+                    }
+                    for result in results
+                    if result[CONF_EVENT_DATA] is not None
+                ]
+            },
+        )
+
+    async def sevice_health(call: ServiceCall) -> None:
+        """Handle Service health."""
+        results = await async_query_decks(hass)
+        hass.bus.async_fire(
+            f"{DOMAIN}_health",
+            {
+                ATTR_DECKS: [
+                    {
+                        ATTR_ENTRY_ID: result[ATTR_ENTRY_ID],
+                        CONF_HOST: result[CONF_HOST],
+                        ATTR_AVAILABLE: result[CONF_EVENT_DATA] is not None,
+                        ATTR_LATENCY: result[ATTR_LATENCY],
+                    }
+                    for result in results
+                ]
+            },
+        )
 
     async def sevice_dump(call: ServiceCall) -> None:
         """Handle Service dump."""
@@ -116,9 +240,54 @@ def setup(hass: HomeAssistant, config: ConfigType) -> bool:
                 },
             )
 
+    async def sevice_profile(call: ServiceCall) -> None:
+        """Handle Service profile."""
+        session = start_session()
+        if session is None:
+            raise HomeAssistantError("Profiling of Stream Decks is already running")
+        duration: float = call.data[ATTR_DURATION]
+        top: int = call.data[ATTR_TOP]
+        _LOGGER.info("Method sevice_profile: Profiling for %s seconds", duration)
+
+        async def finish(_now=None):
+            stop_session()
+            path = hass.config.path(
+                f"{DOMAIN}_profile_{time.strftime('%Y%m%d_%H%M%S')}.prof"
+            )
+            functions = await hass.async_add_executor_job(session.write, path, top)
+            _LOGGER.info("Method sevice_profile: Profile written to %s", path)
+            hass.bus.async_fire(
+                f"{DOMAIN}_profile",
+                {
+                    ATTR_FILE: path,
+                    ATTR_DURATION: duration,
+                    ATTR_CALLS: session.calls,
+                    ATTR_FUNCTIONS: functions,
+                },
+            )
+
+        # Don't block the caller while profiling
+        async_call_later(hass, duration, finish)
+
     # Register services
     hass.services.register(DOMAIN, "sdinfo", sevice_sdinfo, schema=vol.Schema({}))
     hass.services.register(DOMAIN, "dump", sevice_dump, schema=vol.Schema({}))
+    hass.services.register(DOMAIN, "health", sevice_health, schema=vol.Schema({}))
+    hass.services.register(
+        DOMAIN,
+        "profile",
+        sevice_profile,
+        schema=vol.Schema(
+            {
+                vol.Optional(ATTR_DURATION, default=PROFILE_DEFAULT_DURATION): vol.All(
+                    vol.Coerce(float), vol.Range(min=1, max=PROFILE_MAX_DURATION)
+                ),
+                vol.Optional(ATTR_TOP, default=PROFILE_DEFAULT_TOP): vol.All(
+                    cv.positive_int, vol.Range(min=1)
+                ),
+            }
+        ),
+    )
 
     return True
 
@@ -131,71 +300,152 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     def on_button_press(uuid: str):
         button = StreamDeckButton.get_button(hass, entry.entry_id, uuid)
-        button.button_pressed()
+        if button is None:
+            return
+        stats: StreamDeckStats = hass.data[DOMAIN][entry.entry_id][DATA_STATS]
+        stats.press_started = time.monotonic()
+        try:
+            button.button_pressed()
+        finally:
+            stats.press_started = None
+
+    def on_ws_connect():
+        entry_data = hass.data[DOMAIN].get(entry.entry_id)
+        if not isinstance(entry_data, dict):
+            return
+        stats: StreamDeckStats = entry_data[DATA_STATS]
+        stats.count(STAT_WS_CONNECTS)
+        # Only send icons which differ from the ones shown on the deck
+        task: asyncio.Task | None = entry_data.get(DATA_SYNC_TASK)
+        if task is not None:
+            task.cancel()
+        entry_data[DATA_SYNC_TASK] = hass.async_create_task(
+            async_sync_icons(hass, entry.entry_id)
+        )
 
+    @profiled
     def on_ws_message(msg: SDWebsocketMessage):
+        if entry.entry_id not in hass.data[DOMAIN]:
+            # Websocket is closed after the entry has been unloaded
+            return
+        stats: StreamDeckStats = hass.data[DOMAIN][entry.entry_id][DATA_STATS]
+        stats.ws_events[msg.event] += 1
+        # Handle presses before anything else
+        if msg.event == EVENT_SHORT_PRESS and isinstance(msg.args, str):
+            # Release of a held PLUS or MINUS button is no press
+            holds: dict = hass.data[DOMAIN][entry.entry_id][DATA_HOLDS]
+            if holds.get(msg.args) is True:
+                holds.pop(msg.args)
+            else:
+                on_button_press(msg.args)
+        elif msg.event == EVENT_KEY_DOWN and isinstance(msg.args, str):
+            start_hold(hass, entry.entry_id, msg.args)
+        elif msg.event == EVENT_KEY_UP and isinstance(msg.args, str):
+            stop_hold(hass, entry.entry_id, msg.args)
         hass.bus.async_fire(
             f"{DOMAIN}_{msg.event}", {CONF_HOST: host, CONF_EVENT_DATA: msg.args}
         )
-        if msg.event == EVENT_SHORT_PRESS and isinstance(msg.args, str):
-            on_button_press(msg.args)
-        elif msg.event == EVENT_LONG_PRESS and isinstance(msg.args, str):
+        if msg.event == EVENT_SHORT_PRESS:
+            return
+        if msg.event == EVENT_LONG_PRESS and isinstance(msg.args, str):
             # Update current entity
             entity = get_button_entity(hass, entry.entry_id, msg.args)
-            if entity is None:
+            if not entity:
                 return
-            hass.data[DOMAIN][entry.entry_id][DATA_CURRENT_ENTITY] = entity
-            _LOGGER.info("Set current button to %s", entity)
-            # Update icons for UP and DOWN buttons (updates all buttons, in case there are multiple)
-            StreamDeckButton.update_all_button_icons(hass, entry.entry_id)
+            set_current_entity(hass, entry.entry_id, entity)
+        elif isinstance(msg.args, SDInfo):
+            # Status updates contain the current info
+            hass.data[DOMAIN][entry.entry_id][DATA_INFO] = (time.monotonic(), msg.args)
 
     # Create data structure
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN].setdefault(entry.entry_id, {})
     hass.data[DOMAIN][entry.entry_id][DATA_CURRENT_ENTITY] = None
+    hass.data[DOMAIN][entry.entry_id][DATA_BUTTONS] = {}
+    hass.data[DOMAIN][entry.entry_id][DATA_STATS] = StreamDeckStats()
     hass.data[DOMAIN][entry.entry_id][CONF_SHOW_NAME] = entry.data.get(CONF_SHOW_NAME)
+    hass.data[DOMAIN][entry.entry_id][CONF_OPTIMISTIC] = entry.data.get(
+        CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC
+    )
+    hass.data[DOMAIN][entry.entry_id][DATA_OPTIMISTIC] = {}
+    hass.data[DOMAIN][entry.entry_id][DATA_ADJUSTMENTS] = {}
+    hass.data[DOMAIN][entry.entry_id][DATA_HOLDS] = {}
+    hass.data[DOMAIN][entry.entry_id][CONF_REPEAT_RATE] = entry.data.get(
+        CONF_REPEAT_RATE, DEFAULT_REPEAT_RATE
+    )
     hass.data[DOMAIN][entry.entry_id].setdefault(DATA_SELECT_ENTITIES, [])
+    hass.data[DOMAIN][entry.entry_id][DATA_ENTITY_INDEX] = {}
+    hass.data[DOMAIN][entry.entry_id][DATA_MODIFIER_BUTTONS] = set()
+    hass.data[DOMAIN][entry.entry_id][DATA_TRACKED_ENTITIES] = set()
+    hass.data[DOMAIN][entry.entry_id][DATA_SELECT_DEBOUNCER] = Debouncer(
+        hass,
+        _LOGGER,
+        cooldown=SELECT_OPTIONS_COOLDOWN,
+        immediate=False,
+        function=partial(update_select_options, hass, entry.entry_id),
+    )
 
     # Create API client
     hass.data[DOMAIN][entry.entry_id][DATA_API] = StreamDeckApi(
         host,
         on_ws_message=on_ws_message,
-        on_ws_connect=lambda: StreamDeckButton.update_all_button_icons(
-            hass, entry.entry_id
-        ),
+        on_ws_connect=on_ws_connect,
     )
     api = hass.data[DOMAIN][entry.entry_id][DATA_API]
 
     if api is None:
         return False
 
-    # Check if Stream Deck is available
-    info = await api.get_info()
+    # Also stops everything if the setup fails from here on
+    entry.async_on_unload(partial(async_shutdown_entry, hass, entry.entry_id))
+
+    hass.data[DOMAIN][entry.entry_id][DATA_ICON_SCHEDULER] = StreamDeckIconScheduler(
+        hass, api, entry.entry_id, hass.data[DOMAIN][entry.entry_id][DATA_STATS]
+    )
+    update_rasterizer(
+        hass, entry.entry_id, entry.data.get(CONF_RASTERIZE, DEFAULT_RASTERIZE)
+    )
+
+    # Use last known layout, so a late Stream Deck doesn't block startup
+    info: SDInfo | None = None
+    last_info = entry.data.get(CONF_LAST_INFO)
+    if isinstance(last_info, dict):
+        try:
+            info = SDInfo(last_info)
+        except KeyError:
+            _LOGGER.warning("Last known info of %s is invalid", api.host)
+    if info is not None:
+        hass.data[DOMAIN][entry.entry_id][DATA_INFO] = (time.monotonic(), info)
+    else:
+        # Check if Stream Deck is available
+        info = await async_get_info(hass, entry.entry_id)
     if info is None:
         _LOGGER.error("Stream Deck not available at %s", api.host)
         raise ConfigEntryNotReady(f"Timeout while connecting to {api.host}")
 
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-
-    # Register update listener for options flow updates
-    entry.async_on_unload(entry.add_update_listener(update_listener))
-
-    # Fill config entry with buttons
-    button_entries = {}
+    # Create buttons, config entry data is only used for persistence
+    buttons: dict[str, StreamDeckButton] = {}
     for _, button_info in info.buttons.items():
         button = StreamDeckButton(button_info.uuid, hass, entry.entry_id)
         button.set_type(ButtonType.ENTITY_BUTTON)
         button.set_entity("")
-        button_entries[button_info.uuid] = button.to_dict()
+        buttons[button_info.uuid] = button
     current_buttons: dict = entry.data[CONF_BUTTONS]
     for uuid, config in current_buttons.items():
-        button = StreamDeckButton.from_dict(config, hass, entry.entry_id)
-        button_entries[uuid] = button.to_dict()
+        buttons[uuid] = StreamDeckButton.from_dict(config, hass, entry.entry_id)
+    hass.data[DOMAIN][entry.entry_id][DATA_BUTTONS] = buttons
+
+    # Fill config entry with buttons
     changed = hass.config_entries.async_update_entry(
         entry,
         data={
             **entry.data,
-            **{CONF_BUTTONS: button_entries},
+            **{
+                CONF_BUTTONS: {
+                    uuid: button.to_dict() for uuid, button in buttons.items()
+                },
+                CONF_LAST_INFO: info_layout(info),
+            },
         },
     )
     if changed is False:
@@ -203,33 +453,112 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             "Method async_setup_entry: Config entry %s has not been changed",
             entry.entry_id,
         )
+    update_entity_index(hass, entry.entry_id)
+
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    # Register update listener for options flow updates
+    entry.async_on_unload(entry.add_update_listener(update_listener))
 
     api.start_websocket_loop()
 
-    # Add listener for entity change events
-    hass.bus.async_listen(
-        EVENT_STATE_CHANGED,
-        lambda event: on_entity_state_change(hass, entry.entry_id, event),
-    )
+    # Add listeners for entities added to or removed from the enabled platforms
+    track_enabled_platforms(hass, entry.entry_id)
 
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    api: StreamDeckApi = hass.data[DOMAIN][entry.entry_id][DATA_API]
-    api.stop_websocket_loop()
+    async_shutdown_entry(hass, entry.entry_id)
     if unload_ok := await hass.config_entries.async_unload_platforms(
-        entry, [Platform.SELECT]
+        entry, PLATFORMS
     ):
         hass.data[DOMAIN].pop(entry.entry_id)
     return unload_ok
 
 
+@callback
+def async_shutdown_entry(hass: HomeAssistant, entry_id: str):
+    """Stop all listeners, timers and tasks of a config entry."""
+    entry_data = hass.data[DOMAIN].get(entry_id)
+    if not isinstance(entry_data, dict):
+        return
+
+    api: StreamDeckApi = entry_data[DATA_API]
+    api.stop_websocket_loop()
+    # Workaround for streamdeckapi==0.0.13: the loop only checks for the stop
+    # between messages and the API has no way to await or cancel it, so the
+    # private task is cancelled. Revisit when bumping the requirement.
+    ws_task: asyncio.Task | None = getattr(api, "_task", None)
+    if ws_task is not None:
+        ws_task.cancel()
+    sync_task: asyncio.Task | None = entry_data.pop(DATA_SYNC_TASK, None)
+    if sync_task is not None:
+        sync_task.cancel()
+
+    for unsub_key in (DATA_STATE_UNSUB, DATA_DOMAIN_UNSUB):
+        unsub = entry_data.pop(unsub_key, None)
+        if unsub is not None:
+            unsub()
+    entry_data[DATA_TRACKED_ENTITIES] = set()
+    entry_data.pop(DATA_TRACKED_PLATFORMS, None)
+    debouncer: Debouncer = entry_data[DATA_SELECT_DEBOUNCER]
+    debouncer.async_cancel()
+
+    # Send values of PLUS and MINUS presses which are still pending
+    adjustments: dict[str, PendingAdjustment] = entry_data[DATA_ADJUSTMENTS]
+    for entity_id, adjustment in list(adjustments.items()):
+        if adjustment.unsub is not None:
+            adjustment.unsub()
+            send_adjustment(hass, entry_id, entity_id)
+    adjustments.clear()
+    holds: dict[str, ButtonHold | bool] = entry_data[DATA_HOLDS]
+    for hold in holds.values():
+        if isinstance(hold, ButtonHold) and hold.unsub is not None:
+            hold.unsub()
+    holds.clear()
+    optimistic: dict[str, CALLBACK_TYPE] = entry_data[DATA_OPTIMISTIC]
+    for unsub in optimistic.values():
+        unsub()
+    optimistic.clear()
+
+    scheduler: StreamDeckIconScheduler | None = entry_data.get(DATA_ICON_SCHEDULER)
+    if scheduler is not None:
+        scheduler.async_shutdown()
+    # Write pending button changes
+    if entry_data.get(DATA_SAVE_UNSUB) is not None:
+        save_buttons(hass, entry_id)
+
+
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry):
     """Handle options update."""
-    hass.data[DOMAIN][entry.entry_id][CONF_SHOW_NAME] = entry.data.get(CONF_SHOW_NAME)
-    StreamDeckButton.update_all_button_icons(hass, entry.entry_id)
+    entry_data = hass.data[DOMAIN].get(entry.entry_id)
+    if not isinstance(entry_data, dict):
+        # Saved while unloading, nothing to update
+        return
+    if track_enabled_platforms(hass, entry.entry_id):
+        update_select_options(hass, entry.entry_id)
+    entry_data[CONF_OPTIMISTIC] = entry.data.get(CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC)
+    entry_data[CONF_REPEAT_RATE] = entry.data.get(
+        CONF_REPEAT_RATE, DEFAULT_REPEAT_RATE
+    )
+    redraw = False
+    if update_rasterizer(
+        hass, entry.entry_id, entry.data.get(CONF_RASTERIZE, DEFAULT_RASTERIZE)
+    ):
+        # Icons are sent in another format, send all of them again
+        scheduler: StreamDeckIconScheduler = entry_data[DATA_ICON_SCHEDULER]
+        scheduler.sync({})
+        redraw = True
+
+    # Button changes are applied directly, only redraw if the layout changed
+    show_name = entry.data.get(CONF_SHOW_NAME)
+    if entry_data[CONF_SHOW_NAME] != show_name:
+        entry_data[CONF_SHOW_NAME] = show_name
+        redraw = True
+    if redraw:
+        StreamDeckButton.update_all_button_icons(hass, entry.entry_id)
 
 
 #
@@ -265,26 +594,23 @@ class StreamDeckSelect(SelectEntity):
             ATTR_DEVICE_ID: button_device,
         }
 
+    async def async_added_to_hass(self) -> None:
+        """Fill options when added to hass."""
+        self._attr_options = get_select_options(self.hass, self._sd_entry_id)
+
     async def async_select_option(self, option: str) -> None:
         """Change the selected option."""
         self._attr_current_option = option
-        # Get current config entry
-        entry = self.hass.config_entries.async_get_entry(self._sd_entry_id)
-        if entry is None:
-            _LOGGER.error(
-                "Method async_select_option: Config entry %s not available",
-                self._sd_entry_id,
-            )
-            return
-        if entry.data.get(CONF_BUTTONS) is None:
-            _LOGGER.error(
-                "Method async_select_option: Config entry %s has no data for 'buttons'",
-                self._sd_entry_id,
-            )
-            return
 
-        # Create Button object
-        button = StreamDeckButton(self._btn_uuid, self.hass, self._sd_entry_id)
+        # Get Button object
+        buttons: dict[str, StreamDeckButton] = self.hass.data[DOMAIN][
+            self._sd_entry_id
+        ][DATA_BUTTONS]
+        button = buttons.get(self._btn_uuid)
+        if button is None:
+            button = StreamDeckButton(self._btn_uuid, self.hass, self._sd_entry_id)
+            buttons[self._btn_uuid] = button
+        button.set_entity("")
         if option == SELECT_OPTION_UP:
             button.set_type(ButtonType.PLUS_BUTTON)
         elif option == SELECT_OPTION_DOWN:
@@ -293,28 +619,15 @@ class StreamDeckSelect(SelectEntity):
             button.set_type(ButtonType.ENTITY_BUTTON)
             button.set_entity(option)
 
-        # Update config entry
-        changed = self.hass.config_entries.async_update_entry(
-            entry,
-            data={
-                **entry.data,
-                **{
-                    CONF_BUTTONS: {
-                        **entry.data[CONF_BUTTONS],
-                        **{self._btn_uuid: button.to_dict()},
-                    }
-                },
-            },
-        )
-        if changed is False:
-            _LOGGER.error(
-                "Method async_select_option: Config entry %s has not been changed",
-                self._sd_entry_id,
-            )
+        # Config entry is updated later, to save multiple changes at once
+        schedule_save_buttons(self.hass, self._sd_entry_id)
+        update_entity_index(self.hass, self._sd_entry_id)
         button.update_icon()
 
     async def async_set_options(self, options: list[str]) -> None:
         """Set options."""
+        if options == self._attr_options:
+            return
         self._attr_options = options
 
         if self.current_option not in self.options:
@@ -324,8 +637,64 @@ class StreamDeckSelect(SelectEntity):
                 ", ".join(self.options),
             )
 
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+
+class StreamDeckPerformanceSensor(SensorEntity):
+    """Stream Deck diagnostic sensor, updated from in-process counters."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_has_entity_name = True
+    # Refreshed by its own timer, platform polling is not stopped when all
+    # sensors are disabled
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        device: DeviceInfo | None,
+        entry_id: str,
+        key: str,
+        name: str,
+        value_fn: Callable[[dict], StateType],
+        unit: str | None = None,
+        state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT,
+    ) -> None:
+        """Init the diagnostic sensor."""
+        self._attr_name = name
+        self._attr_unique_id = get_unique_id(f"{entry_id} {key}")
+        self._attr_device_info = device
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+        self._sd_entry_id = entry_id
+        self._value_fn = value_fn
+
+    async def async_added_to_hass(self) -> None:
+        """Read the counters now and periodically."""
+        self._update_value()
+        self.async_on_remove(
+            async_track_time_interval(
+                self.hass,
+                self._async_refresh,
+                timedelta(seconds=SENSOR_UPDATE_INTERVAL),
+            )
+        )
+
+    @callback
+    def _async_refresh(self, _now=None):
+        """Read the counters and write the state."""
+        self._update_value()
         self.async_write_ha_state()
 
+    @callback
+    def _update_value(self):
+        """Read the counters."""
+        entry_data = self.hass.data[DOMAIN].get(self._sd_entry_id)
+        if not isinstance(entry_data, dict):
+            return
+        self._attr_native_value = self._value_fn(entry_data)
+
 
 #
 #   Button class
@@ -341,9 +710,22 @@ class ButtonType(Enum):
     MINUS_BUTTON = 3
 
 
+# Icon layout per button type and show_name option
+BUTTON_TEMPLATES: dict[tuple[ButtonType, bool], Callable[..., str]] = {
+    (ButtonType.ENTITY_BUTTON, True): icons.render_entity_named,
+    (ButtonType.PLUS_BUTTON, True): icons.render_plus_named,
+    (ButtonType.MINUS_BUTTON, True): icons.render_minus_named,
+    (ButtonType.ENTITY_BUTTON, False): icons.render_entity,
+    (ButtonType.PLUS_BUTTON, False): icons.render_plus,
+    (ButtonType.MINUS_BUTTON, False): icons.render_minus,
+}
+
+
 class StreamDeckButton:
     """Stream Deck Button class."""
 
+    __slots__ = ("button_type", "entity", "uuid", "hass", "entry_id")
+
     def __init__(self, uuid: str, hass: HomeAssistant, entry_id: str) -> None:
         """Init Stream Deck Button."""
         self.button_type = ButtonType.UNDEFINED
@@ -351,7 +733,6 @@ class StreamDeckButton:
         self.uuid = uuid
         self.hass = hass
         self.entry_id = entry_id
-        self.api: StreamDeckApi = hass.data[DOMAIN][entry_id][DATA_API]
 
     def set_entity(self, entity: str):
         """Set entity."""
@@ -386,90 +767,117 @@ class StreamDeckButton:
         }
 
     @staticmethod
-    def get_button(hass: HomeAssistant, entry_id: str, uuid: str):
+    def get_button(
+        hass: HomeAssistant, entry_id: str, uuid: str
+    ) -> StreamDeckButton | None:
         """Get button by entry_id and uuid."""
-        # Get config entry
-        loaded_entry = hass.config_entries.async_get_entry(entry_id)
-        if loaded_entry is None:
-            return None
-
-        # Get buttons from entry
-        buttons = loaded_entry.data.get(CONF_BUTTONS)
-        if not isinstance(buttons, dict):
-            _LOGGER.error(
-                "Method StreamDeckButton.get_button: Config entry %s has no data for 'buttons'",
-                entry_id,
-            )
+        entry_data = hass.data[DOMAIN].get(entry_id)
+        if not isinstance(entry_data, dict):
             return None
 
         # Get button
-        button_config = buttons.get(uuid)
-        if not isinstance(button_config, dict):
+        button = entry_data[DATA_BUTTONS].get(uuid)
+        if button is None:
             _LOGGER.info(
-                "Method StreamDeckButton.get_button: Config entry %s has no data for buttons.%s",
+                "Method StreamDeckButton.get_button: Config entry %s has no button %s",
                 entry_id,
                 uuid,
             )
+        return button
+
+    def call_service(
+        self,
+        domain: str,
+        service: str,
+        service_data: dict | None = None,
+        target: dict | None = None,
+    ):
+        """Call a service without waiting for it."""
+        call_service(self.hass, self.entry_id, domain, service, service_data, target)
+
+    def get_commanded_value(self, state: State, attribute: str) -> float | None:
+        """Get the value last commanded for an entity if it is more recent than its state."""
+        adjustments: dict[str, PendingAdjustment] = self.hass.data[DOMAIN][
+            self.entry_id
+        ][DATA_ADJUSTMENTS]
+        adjustment = adjustments.get(state.entity_id)
+        if adjustment is None or adjustment.attribute != attribute:
+            return None
+        if (
+            adjustment.unsub is None
+            and time.monotonic() - adjustment.commanded_at > ADJUST_MEMORY
+        ):
             return None
-        return StreamDeckButton.from_dict(button_config, hass, entry_id)
+        return adjustment.value
+
+    def command_value(self, state: State, service: str, attribute: str, value: float):
+        """Accumulate presses into one service call sent after a short window."""
+        adjustments: dict[str, PendingAdjustment] = self.hass.data[DOMAIN][
+            self.entry_id
+        ][DATA_ADJUSTMENTS]
+        adjustment = adjustments.get(state.entity_id)
+        if adjustment is None or adjustment.attribute != attribute:
+            if adjustment is not None and adjustment.unsub is not None:
+                adjustment.unsub()
+            adjustment = PendingAdjustment(state.domain, service, attribute)
+            adjustments[state.entity_id] = adjustment
+        adjustment.value = value
+        adjustment.commanded_at = time.monotonic()
+        if adjustment.unsub is None:
+            # Limit service calls while the button is held
+            window = ADJUST_WINDOW
+            entry_data = self.hass.data[DOMAIN][self.entry_id]
+            if self.uuid in entry_data[DATA_HOLDS]:
+                window = max(window, 1 / entry_data[CONF_REPEAT_RATE])
+            stats: StreamDeckStats = entry_data[DATA_STATS]
+            adjustment.pressed_at = stats.press_started
+            adjustment.unsub = async_call_later(
+                self.hass,
+                window,
+                partial(send_adjustment, self.hass, self.entry_id, state.entity_id),
+            )
 
     def toggle_climate(self, state: State):
         """Toggle climate entity."""
         if state.attributes.get(climate.ATTR_HVAC_ACTION) == HVACMode.OFF:
-            asyncio.run_coroutine_threadsafe(
-                self.hass.services.async_call(
-                    state.domain,
-                    climate.SERVICE_TURN_ON,
-                    target={CONF_ENTITY_ID: self.entity},
-                ),
-                self.hass.loop,
+            self.call_service(
+                state.domain,
+                climate.SERVICE_TURN_ON,
+                target={CONF_ENTITY_ID: self.entity},
             )
         else:
-            asyncio.run_coroutine_threadsafe(
-                self.hass.services.async_call(
-                    state.domain,
-                    climate.SERVICE_TURN_OFF,
-                    target={CONF_ENTITY_ID: self.entity},
-                ),
-                self.hass.loop,
+            self.call_service(
+                state.domain,
+                climate.SERVICE_TURN_OFF,
+                target={CONF_ENTITY_ID: self.entity},
             )
 
     def toggle_media_player(self, state: State):
         """Toggle media_player entity."""
         if state.state != STATE_PLAYING:
-            asyncio.run_coroutine_threadsafe(
-                self.hass.services.async_call(
-                    state.domain,
-                    SERVICE_MEDIA_PLAY,
-                    target={CONF_ENTITY_ID: self.entity},
-                ),
-                self.hass.loop,
+            self.call_service(
+                state.domain,
+                SERVICE_MEDIA_PLAY,
+                target={CONF_ENTITY_ID: self.entity},
             )
         else:
-            asyncio.run_coroutine_threadsafe(
-                self.hass.services.async_call(
-                    state.domain,
-                    SERVICE_MEDIA_PAUSE,
-                    target={CONF_ENTITY_ID: self.entity},
-                ),
-                self.hass.loop,
+            self.call_service(
+                state.domain,
+                SERVICE_MEDIA_PAUSE,
+                target={CONF_ENTITY_ID: self.entity},
             )
 
     def light_control(self, state: State):
         """Handle light controls."""
 
-        # Get current brightness
-        brightness = state.attributes.get(CONF_BRIGHTNESS)
+        # Get current brightness, starting from the last commanded one
+        brightness = self.get_commanded_value(state, CONF_BRIGHTNESS)
+        if brightness is None:
+            brightness = state.attributes.get(CONF_BRIGHTNESS)
         if not isinstance(brightness, int):
             # If light is not on, turn on with smallest brightness
-            asyncio.run_coroutine_threadsafe(
-                self.hass.services.async_call(
-                    state.domain,
-                    SERVICE_TURN_ON,
-                    target={CONF_ENTITY_ID: state.entity_id},
-                    service_data={CONF_BRIGHTNESS: LIGHT_UP_DOWN_STEPS},
-                ),
-                self.hass.loop,
+            self.command_value(
+                state, SERVICE_TURN_ON, CONF_BRIGHTNESS, LIGHT_UP_DOWN_STEPS
             )
             return
 
@@ -480,30 +888,21 @@ class StreamDeckButton:
             brightness = max(brightness - LIGHT_UP_DOWN_STEPS, 0)
 
         # Write new brightness
-        asyncio.run_coroutine_threadsafe(
-            self.hass.services.async_call(
-                state.domain,
-                SERVICE_TURN_ON,
-                target={CONF_ENTITY_ID: state.entity_id},
-                service_data={CONF_BRIGHTNESS: brightness},
-            ),
-            self.hass.loop,
-        )
+        self.command_value(state, SERVICE_TURN_ON, CONF_BRIGHTNESS, brightness)
 
     def climate_control(self, state: State):
         """Handle climate controls."""
 
-        # Get current temperature
-        temperature = state.attributes.get(ATTR_TEMPERATURE)
-        if not isinstance(temperature, int):
+        # Get current temperature, starting from the last commanded one
+        temperature = self.get_commanded_value(state, ATTR_TEMPERATURE)
+        if temperature is None:
+            temperature = state.attributes.get(ATTR_TEMPERATURE)
+        if not isinstance(temperature, (int, float)):
             # If climate device is not on, turn on
-            asyncio.run_coroutine_threadsafe(
-                self.hass.services.async_call(
-                    state.domain,
-                    SERVICE_SET_TEMPERATURE,
-                    target={CONF_ENTITY_ID: state.entity_id},
-                ),
-                self.hass.loop,
+            self.call_service(
+                state.domain,
+                SERVICE_SET_TEMPERATURE,
+                target={CONF_ENTITY_ID: state.entity_id},
             )
             return
 
@@ -514,51 +913,34 @@ class StreamDeckButton:
             temperature = temperature - CLIMATE_UP_DOWN_STEPS
 
         # Write new temperature
-        asyncio.run_coroutine_threadsafe(
-            self.hass.services.async_call(
-                state.domain,
-                SERVICE_SET_TEMPERATURE,
-                target={CONF_ENTITY_ID: state.entity_id},
-                service_data={ATTR_TEMPERATURE: temperature},
-            ),
-            self.hass.loop,
+        self.command_value(
+            state, SERVICE_SET_TEMPERATURE, ATTR_TEMPERATURE, temperature
         )
 
     def media_player_control(self, state: State):
         """Handle media_player controls."""
 
-        # Get current volume
-        volume = state.attributes.get(ATTR_MEDIA_VOLUME_LEVEL)
-        if not isinstance(volume, float):
+        # Get current volume, starting from the last commanded one
+        volume = self.get_commanded_value(state, ATTR_MEDIA_VOLUME_LEVEL)
+        if volume is None:
+            volume = state.attributes.get(ATTR_MEDIA_VOLUME_LEVEL)
+        if not isinstance(volume, (int, float)):
             # If media_player device is not on, turn on with smallest volume
-            asyncio.run_coroutine_threadsafe(
-                self.hass.services.async_call(
-                    state.domain,
-                    SERVICE_VOLUME_SET,
-                    target={CONF_ENTITY_ID: state.entity_id},
-                    service_data={ATTR_MEDIA_VOLUME_LEVEL: VOLUME_UP_DOWN_STEPS},
-                ),
-                self.hass.loop,
+            self.command_value(
+                state, SERVICE_VOLUME_SET, ATTR_MEDIA_VOLUME_LEVEL, VOLUME_UP_DOWN_STEPS
             )
             return
 
         # Update volume
         if self.button_type == ButtonType.PLUS_BUTTON:
-            volume = min(volume + VOLUME_UP_DOWN_STEPS, 1)
+            volume = min(volume + VOLUME_UP_DOWN_STEPS, 1.0)
         elif self.button_type == ButtonType.MINUS_BUTTON:
-            volume = max(volume - VOLUME_UP_DOWN_STEPS, 0)
+            volume = max(volume - VOLUME_UP_DOWN_STEPS, 0.0)
 
         # Write new volume
-        asyncio.run_coroutine_threadsafe(
-            self.hass.services.async_call(
-                state.domain,
-                SERVICE_VOLUME_SET,
-                target={CONF_ENTITY_ID: state.entity_id},
-                service_data={ATTR_MEDIA_VOLUME_LEVEL: volume},
-            ),
-            self.hass.loop,
-        )
+        self.command_value(state, SERVICE_VOLUME_SET, ATTR_MEDIA_VOLUME_LEVEL, volume)
 
+    @profiled
     def button_pressed(self):
         """Handle button press."""
 
@@ -579,20 +961,18 @@ class StreamDeckButton:
             elif state.domain == Platform.MEDIA_PLAYER:
                 self.toggle_media_player(state)
             else:
-                asyncio.run_coroutine_threadsafe(
-                    self.hass.services.async_call(
-                        state.domain,
-                        SERVICE_TOGGLE,
-                        target={CONF_ENTITY_ID: self.entity},
-                    ),
-                    self.hass.loop,
+                self.call_service(
+                    state.domain,
+                    SERVICE_TOGGLE,
+                    target={CONF_ENTITY_ID: self.entity},
                 )
 
-            # Save last pressed entity to use for UP and DOWN buttons
-            self.hass.data[DOMAIN][self.entry_id][DATA_CURRENT_ENTITY] = self.entity
+                # Show the expected state until the real state arrives
+                if self.hass.data[DOMAIN][self.entry_id][CONF_OPTIMISTIC]:
+                    show_expected_state(self.hass, self.entry_id, state)
 
-            # Update icons for UP and DOWN buttons (updates all buttons, in case there are multiple)
-            StreamDeckButton.update_all_button_icons(self.hass, self.entry_id)
+            # Save last pressed entity to use for UP and DOWN buttons
+            set_current_entity(self.hass, self.entry_id, self.entity)
 
         if self.button_type in (ButtonType.PLUS_BUTTON, ButtonType.MINUS_BUTTON):
             # Get current entity
@@ -622,34 +1002,59 @@ class StreamDeckButton:
             elif state.domain == Platform.MEDIA_PLAYER:
                 self.media_player_control(state)
 
+    @staticmethod
+    def update_modifier_button_icons(hass: HomeAssistant, entry_id: str):
+        """Update icons of all PLUS and MINUS buttons."""
+        modifier_buttons: set[str] = hass.data[DOMAIN][entry_id][DATA_MODIFIER_BUTTONS]
+        for uuid in modifier_buttons:
+            button = StreamDeckButton.get_button(hass, entry_id, uuid)
+            if button is not None:
+                button.update_icon()
+
     @staticmethod
     def update_all_button_icons(hass: HomeAssistant, entry_id: str):
         """Initialize all buttons."""
-        # Get config_entry
-        loaded_entry = hass.config_entries.async_get_entry(entry_id)
-        if loaded_entry is None:
-            return None
-
-        # Get buttons
-        buttons = loaded_entry.data.get(CONF_BUTTONS)
-        if not isinstance(buttons, dict):
-            _LOGGER.error(
-                "Method update_all_button_icons: Config entry %s has no data for 'buttons'",
-                entry_id,
-            )
+        entry_data = hass.data[DOMAIN].get(entry_id)
+        if not isinstance(entry_data, dict):
             return
 
+        buttons: dict[str, StreamDeckButton] = entry_data[DATA_BUTTONS]
         _LOGGER.info(
             "Method update_all_button_icons: Found %s buttons. Updating icons",
             len(buttons),
         )
 
-        for _, button_config in buttons.items():
-            button = StreamDeckButton.from_dict(button_config, hass, entry_id)
-            button.update_icon()
+        # Render all icons first and send them as one batch
+        icons: dict[str, str] = {}
+        for button in buttons.values():
+            svg = button.render_icon()
+            if svg is not None:
+                icons[button.uuid] = svg
+
+        scheduler: StreamDeckIconScheduler = hass.data[DOMAIN][entry_id][
+            DATA_ICON_SCHEDULER
+        ]
+        scheduler.schedule_batch(icons)
 
+    @profiled
     def update_icon(self):
         """Update icon of button."""
+        svg = self.render_icon()
+        if svg is not None:
+            self.push_icon(svg)
+
+    def render_icon(self, state_override: State | None = None) -> str | None:
+        """Render icon of button, optionally with another state of its entity."""
+        started = time.perf_counter()
+        svg = self._render_icon(state_override)
+        stats: StreamDeckStats = self.hass.data[DOMAIN][self.entry_id][DATA_STATS]
+        stats.record(STAT_RENDER_TIME, time.perf_counter() - started)
+        if svg is not None:
+            stats.count(STAT_ICONS_RENDERED)
+        return svg
+
+    def _render_icon(self, state_override: State | None) -> str | None:
+        """Render icon of button."""
         entity = self.entity
 
         _LOGGER.info(
@@ -658,56 +1063,39 @@ class StreamDeckButton:
             self.button_type,
         )
 
-        svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
-                <rect width="72" height="72" fill="#a00" />
-                <text text-anchor="middle" x="35" y="20" fill="#fff" font-size="13">{self.uuid.split("-")[0]}</text>
-                <text text-anchor="middle" x="35" y="40" fill="#fff" font-size="13">{self.uuid.split("-")[1]}</text>
-                <text text-anchor="middle" x="35" y="60" fill="#fff" font-size="13">{self.uuid.split("-")[2]}</text>
-                </svg>"""
-
         if self.button_type == ButtonType.ENTITY_BUTTON and self.entity == "":
             _LOGGER.info(
                 "Method StreamDeckButton.update_icon: No entity selected for %s. Using default icon",
                 self.uuid,
             )
-            asyncio.run_coroutine_threadsafe(
-                self.api.update_icon(self.uuid, svg), self.hass.loop
-            )
-            return
+            return icons.unbound_icon(self.uuid)
 
         if self.button_type in (ButtonType.PLUS_BUTTON, ButtonType.MINUS_BUTTON):
             base_entity = self.hass.data[DOMAIN][self.entry_id][DATA_CURRENT_ENTITY]
 
             if isinstance(base_entity, str):
                 entity = base_entity
-            else:
+            elif self.button_type == ButtonType.PLUS_BUTTON:
                 # Initial Plus and Minus Buttons
-                if self.button_type == ButtonType.PLUS_BUTTON:
-                    svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
-                        <rect width="72" height="72" fill="#000" />
-                        <rect x="10" y="10" width="52" height="52" fill="{COLOR_INACTIVE}" rx="5" />
-                        <rect x="15" y="31" width="42" height="10" fill="#000" />
-                        <rect x="31" y="15" width="10" height="42" fill="#000" />
-                        </svg>"""
-                elif self.button_type == ButtonType.MINUS_BUTTON:
-                    svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
-                        <rect width="72" height="72" fill="#000" />
-                        <rect x="10" y="10" width="52" height="52" fill="{COLOR_INACTIVE}" rx="5" />
-                        <rect x="15" y="31" width="42" height="10" fill="#000" />
-                        </svg>"""
-                asyncio.run_coroutine_threadsafe(
-                    self.api.update_icon(self.uuid, svg), self.hass.loop
-                )
-                return
+                return icons.render_plus_initial(COLOR_INACTIVE)
+            else:
+                return icons.render_minus_initial(COLOR_INACTIVE)
 
         # Get state
-        state = self.hass.states.get(entity)
+        state = state_override
+        if state is None:
+            state = self.hass.states.get(entity)
         if state is None:
             _LOGGER.info(
                 "Method StreamDeckButton.update_icon: State for entity %s is None",
                 entity,
             )
-            return
+            return None
+
+        show_name = self.hass.data[DOMAIN][self.entry_id][CONF_SHOW_NAME] is True
+        render = BUTTON_TEMPLATES.get((self.button_type, show_name))
+        if render is None:
+            return icons.unbound_icon(self.uuid)
 
         # Set icon color
         icon_color = COLOR_ACTIVE
@@ -737,104 +1125,330 @@ class StreamDeckButton:
                 modifier_color = COLOR_INACTIVE
 
         # Get MDI Icon
-        mdi_string: str | None = state.attributes.get("icon")
-        if mdi_string is None:
-            _LOGGER.info(
-                "Method StreamDeckButton.update_icon: Icon of entity %s is None", entity
-            )
+        mdi_string = resolve_mdi_name(state.attributes.get(ATTR_ICON), state.domain)
+        mdi = get_mdi_icon(mdi_string, icon_color)
+
+        if render is icons.render_entity_named:
+            return render(get_state_text(state), state.name, mdi)
+        if render is icons.render_entity:
+            return render(mdi)
+        if show_name:
+            return render(modifier_color, state.name, mdi)
+        return render(modifier_color, mdi)
+
+    def push_icon(self, svg: str):
+        """Queue icon to be sent to the Stream Deck."""
+        scheduler: StreamDeckIconScheduler = self.hass.data[DOMAIN][self.entry_id][
+            DATA_ICON_SCHEDULER
+        ]
+        scheduler.schedule(self.uuid, svg)
+
+
+class ButtonHold:
+    """Held PLUS or MINUS button."""
+
+    __slots__ = ("steps", "unsub")
+
+    def __init__(self) -> None:
+        """Init button hold."""
+        self.steps = 0
+        self.unsub: CALLBACK_TYPE | None = None
+
+
+class PendingAdjustment:
+    """Value commanded by PLUS and MINUS buttons."""
+
+    __slots__ = (
+        "domain",
+        "service",
+        "attribute",
+        "value",
+        "commanded_at",
+        "pressed_at",
+        "unsub",
+    )
 
-            # Set default icon for entity
-            mdi_string = MDI_DEFAULT
+    def __init__(self, domain: str, service: str, attribute: str) -> None:
+        """Init pending adjustment."""
+        self.domain = domain
+        self.service = service
+        self.attribute = attribute
+        self.value: float = 0
+        self.commanded_at: float = 0
+        self.pressed_at: float | None = None
+        self.unsub: CALLBACK_TYPE | None = None
 
-            # Try to use platform default icon
-            platform_mdi = DEFAULT_ICONS.get(state.domain)
-            if platform_mdi is not None:
-                mdi_string = platform_mdi
-                _LOGGER.info(
-                    "Method StreamDeckButton.update_icon: Using platform default icon for %s",
-                    entity,
-                )
 
-        if mdi_string.startswith(MDI_PREFIX):
-            mdi_string = mdi_string.split(":", 1)[1]
-        mdi = MDI.get_icon(mdi_string, icon_color)
-
-        if self.hass.data[DOMAIN][self.entry_id][CONF_SHOW_NAME] is True:
-            if self.button_type == ButtonType.PLUS_BUTTON:
-                svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
-                    <rect width="72" height="72" fill="#000" />
-                    <rect x="40" y="12" width="25" height="25" fill="{modifier_color}" rx="5" />
-                    <rect x="45" y="22" width="15" height="5" fill="#000" />
-                    <rect x="50" y="17" width="5" height="15" fill="#000" />
-                    <text text-anchor="middle" x="35" y="65" fill="#fff" font-size="12">{state.name}</text>
-                    <g transform="translate(14, 14) scale(0.5)">{mdi}</g>
-                    </svg>"""
-            elif self.button_type == ButtonType.MINUS_BUTTON:
-                svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
-                    <rect width="72" height="72" fill="#000" />
-                    <rect x="40" y="12" width="25" height="25" fill="{modifier_color}" rx="5" />
-                    <rect x="45" y="22" width="15" height="5" fill="#000" />
-                    <text text-anchor="middle" x="35" y="65" fill="#fff" font-size="12">{state.name}</text>
-                    <g transform="translate(14, 14) scale(0.5)">{mdi}</g>
-                    </svg>"""
-            elif self.button_type == ButtonType.ENTITY_BUTTON:
-                state_text = (
-                    f'{state.state}{state.attributes.get(ATTR_UNIT_OF_MEASUREMENT, "")}'
+#
+#   Icon scheduler
+#
+
+
+class StreamDeckIconScheduler:
+    """Coalesce icon uploads to a Stream Deck.
+
+    Only the newest icon per button is kept. Pending icons are sent after a short
+    frame interval with a limited number of uploads in flight. The Stream Deck API
+    has no bulk icon endpoint, so uploads are sent over keep-alive connections of
+    the shared aiohttp session instead of one new connection per icon.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        api: StreamDeckApi,
+        entry_id: str,
+        stats: StreamDeckStats,
+        interval: float = ICON_FLUSH_INTERVAL,
+        max_in_flight: int = ICON_MAX_IN_FLIGHT,
+    ) -> None:
+        """Init Stream Deck icon scheduler."""
+        self.hass = hass
+        self.api = api
+        self.entry_id = entry_id
+        self.stats = stats
+        self.rasterizer: IconRasterizer | None = None
+        self._interval = interval
+        self._max_in_flight = max_in_flight
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._pending: dict[str, str] = {}
+        self._in_flight: dict[str, str] = {}
+        self._sent: dict[str, str] = {}
+        # Rasterized icon and its SVG per button
+        self._rasterized: dict[str, tuple[str, str]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._unsub_flush: CALLBACK_TYPE | None = None
+        self._connected = False
+
+    @property
+    def _icon_url(self) -> str:
+        """URL to icon endpoint."""
+        return f"http://{self.api.host}:{PLUGIN_PORT}{PLUGIN_ICON}/"
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of icons waiting for or being uploaded."""
+        return len(self._pending) + len(self._in_flight)
+
+    @callback
+    def schedule(self, uuid: str, svg: str):
+        """Queue an icon, replacing a pending icon of the same button."""
+        if self._queue(uuid, svg):
+            self._arm()
+
+    @callback
+    def schedule_batch(self, icons: dict[str, str]):
+        """Queue icons of multiple buttons and send them right away."""
+        queued = False
+        for uuid, svg in icons.items():
+            queued = self._queue(uuid, svg) or queued
+        if queued:
+            self._async_flush()
+
+    @callback
+    def sync(self, icons: dict[str, str]):
+        """Replace the sent icons with the icons shown on the Stream Deck."""
+        icons = dict(icons)
+        for uuid, (body, svg) in self._rasterized.items():
+            if icons.get(uuid) == body:
+                icons[uuid] = svg
+        self._sent = icons
+        for uuid, svg in icons.items():
+            if self._pending.get(uuid) == svg:
+                self._pending.pop(uuid)
+
+    @callback
+    def set_connected(self):
+        """Start sending icons queued before the Stream Deck connected."""
+        self._connected = True
+        self._arm()
+
+    @callback
+    def async_shutdown(self):
+        """Cancel pending and running uploads."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        self._pending.clear()
+        for task in self._tasks:
+            task.cancel()
+
+    @callback
+    def _queue(self, uuid: str, svg: str) -> bool:
+        """Add icon to the pending icons if it differs from the expected one."""
+        expected = self._in_flight.get(uuid, self._sent.get(uuid))
+        if expected == svg:
+            # Drop superseded icon, the deck already shows (or gets) this one
+            if self._pending.pop(uuid, None) is None:
+                _LOGGER.debug(
+                    "Method StreamDeckIconScheduler.schedule: Icon of %s unchanged. Skipping",
+                    uuid,
                 )
+            return False
+        self._pending[uuid] = svg
+        return True
+
+    @callback
+    def _arm(self):
+        """Schedule a flush if none is scheduled."""
+        if self._connected and self._unsub_flush is None and self._pending:
+            self._unsub_flush = async_call_later(
+                self.hass, self._interval, self._async_flush
+            )
 
-                if (
-                    state.domain == Platform.LIGHT
-                    and state.attributes.get(CONF_BRIGHTNESS) is not None
-                ):
-                    brightness = state.attributes.get(CONF_BRIGHTNESS)
-                    brightness_pct = int(math_map(brightness, 0, 255, 0, 100))
-                    state_text = f"{brightness_pct}%"
-                elif (
-                    state.domain == climate.DOMAIN
-                    and state.attributes.get(ATTR_TEMPERATURE) is not None
-                ):
-                    temperature = state.attributes.get(ATTR_TEMPERATURE)
-                    state_text = f"{temperature}°C"
-                elif (
-                    state.domain == Platform.MEDIA_PLAYER
-                    and state.attributes.get(ATTR_MEDIA_VOLUME_LEVEL) is not None
-                ):
-                    volume = state.attributes.get(ATTR_MEDIA_VOLUME_LEVEL)
-                    volume_pct = int(math_map(volume, 0, 1, 0, 100))
-                    state_text = f"{volume_pct}%"
-
-                svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
-                    <rect width="72" height="72" fill="#000" />
-                    <text text-anchor="middle" x="35" y="15" fill="#fff" font-size="12">{state_text}</text>
-                    <text text-anchor="middle" x="35" y="65" fill="#fff" font-size="12">{state.name}</text>
-                    <g transform="translate(16, 12) scale(0.5)">{mdi}</g>
-                    </svg>"""
-        else:
-            # Show Entity Icon without name
-            if self.button_type == ButtonType.PLUS_BUTTON:
-                svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
-                    <rect width="72" height="72" fill="#000" />
-                    <rect x="40" y="12" width="25" height="25" fill="{modifier_color}" rx="5" />
-                    <rect x="45" y="22" width="15" height="5" fill="#000" />
-                    <rect x="50" y="17" width="5" height="15" fill="#000" />
-                    <g transform="translate(10, 10) scale(0.7)">{mdi}</g>
-                    </svg>"""
-            elif self.button_type == ButtonType.MINUS_BUTTON:
-                svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
-                    <rect width="72" height="72" fill="#000" />
-                    <rect x="40" y="12" width="25" height="25" fill="{modifier_color}" rx="5" />
-                    <rect x="45" y="22" width="15" height="5" fill="#000" />
-                    <g transform="translate(10, 10) scale(0.7)">{mdi}</g>
-                    </svg>"""
-            elif self.button_type == ButtonType.ENTITY_BUTTON:
-                svg = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">
-                    <rect width="72" height="72" fill="#000" />
-                    <g transform="translate(5, 0) scale(0.8)">{mdi}</g>
-                    </svg>"""
-
-        asyncio.run_coroutine_threadsafe(
-            self.api.update_icon(self.uuid, svg), self.hass.loop
-        )
+    @callback
+    def _async_flush(self, _now=None):
+        """Start uploads of all pending icons."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        if not self._connected:
+            return
+
+        batch: dict[str, str] = {}
+        for uuid in list(self._pending):
+            # Keep order per button, wait for the running upload
+            if uuid in self._in_flight:
+                continue
+            batch[uuid] = self._in_flight[uuid] = self._pending.pop(uuid)
+        if len(batch) == 0:
+            return
+
+        # Split batch into chunks, each chunk is sent over one connection
+        chunks: list[dict[str, str]] = [{} for _ in range(self._max_in_flight)]
+        for i, (uuid, svg) in enumerate(batch.items()):
+            chunks[i % self._max_in_flight][uuid] = svg
+        for chunk in chunks:
+            if len(chunk) == 0:
+                continue
+            task = self.hass.async_create_task(self._async_upload(chunk))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _async_upload(self, chunk: dict[str, str]):
+        """Upload icons one after another."""
+        try:
+            async with self._semaphore:
+                for uuid, svg in chunk.items():
+                    if uuid in self._pending:
+                        # A newer icon has been queued while waiting
+                        self._in_flight.pop(uuid, None)
+                        continue
+                    body = svg
+                    if self.rasterizer is not None:
+                        size = get_key_size(self.hass, self.entry_id, uuid)
+                        body = (
+                            await self.rasterizer.async_rasterize(self.hass, svg, size)
+                            or svg
+                        )
+                    if await self._async_post_icon(uuid, body):
+                        self.stats.count(STAT_ICONS_PUSHED)
+                        self._sent[uuid] = svg
+                        if body is svg:
+                            self._rasterized.pop(uuid, None)
+                        else:
+                            self._rasterized[uuid] = (body, svg)
+                    else:
+                        self._sent.pop(uuid, None)
+                    self._in_flight.pop(uuid, None)
+        finally:
+            for uuid in chunk:
+                self._in_flight.pop(uuid, None)
+            if any(uuid in self._pending for uuid in chunk):
+                self._arm()
+
+    async def _async_post_icon(self, uuid: str, svg: str) -> bool:
+        """Send a single icon to the Stream Deck."""
+        session = async_get_clientsession(self.hass)
+        started = time.monotonic()
+        try:
+            async with session.post(
+                f"{self._icon_url}{uuid}",
+                data=svg.encode("utf-8"),
+                headers={"Content-Type": "image/svg+xml"},
+                timeout=ClientTimeout(total=ICON_UPLOAD_TIMEOUT),
+            ) as res:
+                if res.status != 200:
+                    _LOGGER.debug(
+                        "Error sending icon of %s to Stream Deck (%s). Is the button currently visible?",
+                        uuid,
+                        res.reason,
+                    )
+                    return False
+                self.stats.record(STAT_UPLOAD_TIME, time.monotonic() - started)
+                return True
+        except (ClientError, asyncio.TimeoutError):
+            _LOGGER.debug("Error sending icon of %s to Stream Deck (exception)", uuid)
+            return False
+
+
+#
+#   Statistics
+#
+
+
+class StreamDeckStats:
+    """Cheap in-process counters and timings of a Stream Deck."""
+
+    def __init__(self, max_samples: int = STATS_MAX_SAMPLES) -> None:
+        """Init Stream Deck statistics."""
+        self.counters: dict[str, int] = {}
+        self.timings: dict[str, deque[float]] = {}
+        self.ws_events: Counter[str] = Counter()
+        self.redraws: Counter[str] = Counter()
+        self.press_started: float | None = None
+        self.started = time.monotonic()
+        self._max_samples = max_samples
+
+    def count(self, name: str, value: int = 1):
+        """Increase a counter."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self, name: str, seconds: float):
+        """Add a timing sample, old samples are dropped."""
+        samples = self.timings.get(name)
+        if samples is None:
+            samples = self.timings[name] = deque(maxlen=self._max_samples)
+        samples.append(seconds)
+
+    def percentile(self, name: str, percent: float) -> float | None:
+        """Get a percentile of the recorded samples in seconds."""
+        samples = sorted(self.timings.get(name, ()))
+        if len(samples) == 0:
+            return None
+        index = min(int(len(samples) * percent / 100), len(samples) - 1)
+        return samples[index]
+
+    def histogram(self, name: str) -> dict:
+        """Get the recorded samples as histogram with buckets in milliseconds."""
+        samples = sorted(self.timings.get(name, ()))
+        buckets: dict[str, int] = {}
+        index = 0
+        for bound in HISTOGRAM_BUCKETS:
+            count = 0
+            while index < len(samples) and samples[index] * 1000 <= bound:
+                count += 1
+                index += 1
+            buckets[f"<={bound}"] = count
+        buckets[f">{HISTOGRAM_BUCKETS[-1]}"] = len(samples) - index
+        result: dict = {"count": len(samples), "buckets_ms": buckets}
+        if len(samples) > 0:
+            result.update(
+                {
+                    "min_ms": round(samples[0] * 1000, 3),
+                    "p50_ms": round(self.percentile(name, 50) * 1000, 3),
+                    "p95_ms": round(self.percentile(name, 95) * 1000, 3),
+                    "max_ms": round(samples[-1] * 1000, 3),
+                }
+            )
+        return result
+
+    def ws_event_rates(self) -> dict[str, float]:
+        """Get websocket messages per minute by event type since setup."""
+        minutes = max(time.monotonic() - self.started, 1) / 60
+        return {
+            event: round(count / minutes, 3) for event, count in self.ws_events.items()
+        }
 
 
 #
@@ -861,6 +1475,178 @@ def device_info(entry) -> DeviceInfo:
     )
 
 
+@lru_cache(maxsize=MDI_CACHE_SIZE)
+def resolve_mdi_name(mdi_string: str | None, domain: str) -> str:
+    """Get the MDI icon name for an icon attribute, using defaults if not set."""
+    if mdi_string is None:
+        _LOGGER.info(
+            "Method resolve_mdi_name: Icon is None. Using default icon for %s", domain
+        )
+        # Try to use platform default icon
+        mdi_string = DEFAULT_ICONS.get(domain, MDI_DEFAULT)
+
+    if mdi_string.startswith(MDI_PREFIX):
+        mdi_string = mdi_string.split(":", 1)[1]
+    return mdi_string
+
+
+@lru_cache(maxsize=MDI_CACHE_SIZE)
+def get_mdi_icon(mdi_string: str, color: str) -> str:
+    """Get the svg of a MDI icon in the given color."""
+    return MDI.get_icon(mdi_string, color)
+
+
+def mdi_cache_info() -> dict[str, int]:
+    """Get hit and miss counters of the MDI icon caches."""
+    name_info = resolve_mdi_name.cache_info()
+    icon_info = get_mdi_icon.cache_info()
+    return {
+        "name_hits": name_info.hits,
+        "name_misses": name_info.misses,
+        "icon_hits": icon_info.hits,
+        "icon_misses": icon_info.misses,
+        "icon_size": icon_info.currsize,
+    }
+
+
+async def async_get_info(
+    hass: HomeAssistant,
+    entry_id: str,
+    max_age: float = INFO_MAX_AGE,
+    timeout: float = INFO_TIMEOUT,
+) -> SDInfo | None:
+    """Get info about a Stream Deck, reusing a recent response."""
+    entry_data = hass.data[DOMAIN][entry_id]
+    cached: tuple[float, SDInfo] | None = entry_data.get(DATA_INFO)
+    if cached is not None and time.monotonic() - cached[0] < max_age:
+        return cached[1]
+
+    api: StreamDeckApi = entry_data[DATA_API]
+    started = time.monotonic()
+    try:
+        info = await asyncio.wait_for(api.get_info(), timeout)
+    except asyncio.TimeoutError:
+        _LOGGER.debug("Method async_get_info: Timeout while connecting to %s", api.host)
+        return None
+    stats: StreamDeckStats = entry_data[DATA_STATS]
+    stats.record(STAT_INFO_TIME, time.monotonic() - started)
+    if isinstance(info, SDInfo):
+        entry_data[DATA_INFO] = (time.monotonic(), info)
+        return info
+    return None
+
+
+async def async_query_decks(
+    hass: HomeAssistant, timeout: float = INFO_TIMEOUT
+) -> list[dict]:
+    """Get info about all Stream Decks at once."""
+    domain_data: dict = hass.data.get(DOMAIN, {})
+
+    async def query(entry_id: str) -> dict:
+        api: StreamDeckApi = domain_data[entry_id][DATA_API]
+        start = time.monotonic()
+        info = await async_get_info(hass, entry_id, max_age=0, timeout=timeout)
+        return {
+            ATTR_ENTRY_ID: entry_id,
+            CONF_HOST: api.host,
+            CONF_EVENT_DATA: info,
+            ATTR_LATENCY: round(time.monotonic() - start, 3),
+        }
+
+    entry_ids = [
+        entry.entry_id
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if isinstance(domain_data.get(entry.entry_id), dict)
+        and isinstance(domain_data[entry.entry_id].get(DATA_API), StreamDeckApi)
+    ]
+    return list(await asyncio.gather(*(query(entry_id) for entry_id in entry_ids)))
+
+
+def info_layout(info: SDInfo) -> dict:
+    """Get the layout of a Stream Deck info without the button icons."""
+    layout = dict(info)
+    layout["buttons"] = {
+        uuid: {**button, "svg": ""} for uuid, button in layout["buttons"].items()
+    }
+    return layout
+
+
+def get_key_size(hass: HomeAssistant, entry_id: str, uuid: str) -> int:
+    """Get native key size in pixels of the Stream Deck with the button."""
+    _, info = hass.data[DOMAIN][entry_id].get(DATA_INFO, (0, None))
+    if not isinstance(info, SDInfo) or uuid not in info.buttons:
+        return KEY_SIZE_DEFAULT
+    device_id = info.buttons[uuid].device
+    for device in info.devices:
+        if device.id != device_id:
+            continue
+        if device.type in KEY_SIZES:
+            return KEY_SIZES[device.type]
+        for name, size in KEY_SIZES_BY_NAME.items():
+            if name in device.name:
+                return size
+    return KEY_SIZE_DEFAULT
+
+
+def update_rasterizer(
+    hass: HomeAssistant, entry_id: str, enabled: bool | None
+) -> bool:
+    """Enable or disable rasterizing of icons, returns True if it changed."""
+    scheduler: StreamDeckIconScheduler = hass.data[DOMAIN][entry_id][
+        DATA_ICON_SCHEDULER
+    ]
+    rasterizer: IconRasterizer | None = None
+    if enabled is True:
+        # One cache for all Stream Decks
+        rasterizer = hass.data.setdefault(
+            DATA_RASTERIZER,
+            IconRasterizer(hass.config.path(STORAGE_DIR, RASTER_CACHE_DIR)),
+        )
+    if scheduler.rasterizer is rasterizer:
+        return False
+    scheduler.rasterizer = rasterizer
+    return True
+
+
+async def async_sync_icons(hass: HomeAssistant, entry_id: str):
+    """Send icons that differ from the ones shown on the Stream Deck."""
+    info = await async_get_info(hass, entry_id, max_age=0)
+    entry_data = hass.data[DOMAIN].get(entry_id)
+    if not isinstance(entry_data, dict):
+        return
+
+    scheduler: StreamDeckIconScheduler = entry_data[DATA_ICON_SCHEDULER]
+    if info is not None:
+        # The deck reports its current icons
+        scheduler.sync(
+            {uuid: button_info.svg for uuid, button_info in info.buttons.items()}
+        )
+        update_last_info(hass, entry_id, info)
+    scheduler.set_connected()
+    StreamDeckButton.update_all_button_icons(hass, entry_id)
+
+
+def update_last_info(hass: HomeAssistant, entry_id: str, info: SDInfo):
+    """Store the current layout of a Stream Deck as last known info."""
+    loaded_entry = hass.config_entries.async_get_entry(entry_id)
+    if loaded_entry is None:
+        return
+    layout = info_layout(info)
+    if loaded_entry.data.get(CONF_LAST_INFO) == layout:
+        return
+    if loaded_entry.data.get(CONF_LAST_INFO, {}).get("buttons", {}).keys() != layout[
+        "buttons"
+    ].keys():
+        _LOGGER.warning(
+            "Buttons of Stream Deck at %s changed. Reload the integration to update them",
+            loaded_entry.data.get(CONF_HOST),
+        )
+    hass.config_entries.async_update_entry(
+        loaded_entry,
+        data={**loaded_entry.data, **{CONF_LAST_INFO: layout}},
+    )
+
+
 def get_button_entity(hass: HomeAssistant, entry_id: str, uuid: str) -> str | None:
     """Get the selected entity for a button."""
     button = StreamDeckButton.get_button(hass, entry_id, uuid)
@@ -877,8 +1663,10 @@ def get_button_entity(hass: HomeAssistant, entry_id: str, uuid: str) -> str | No
     return entity
 
 
+@callback
+@profiled
 def on_entity_state_change(hass: HomeAssistant, entry_id: str, event: Event):
-    """Handle entity state changes."""
+    """Handle state changes of entities bound to buttons."""
     entity_id = event.data.get(ATTR_ENTITY_ID)
     if entity_id is None:
         _LOGGER.error("Method on_entity_state_change: Event entity_id is None")
@@ -888,47 +1676,411 @@ def on_entity_state_change(hass: HomeAssistant, entry_id: str, event: Event):
         "Method on_entity_state_change: Received event for entity %s", entity_id
     )
 
+    entry_data = hass.data[DOMAIN].get(entry_id)
+    if not isinstance(entry_data, dict):
+        return
+
+    # Get buttons bound to the entity
+    uuids: set[str] = entry_data[DATA_ENTITY_INDEX].get(entity_id, set())
+    if entity_id == entry_data[DATA_CURRENT_ENTITY]:
+        uuids = uuids | entry_data[DATA_MODIFIER_BUTTONS]
+    if not uuids:
+        return
+
+    stats: StreamDeckStats = entry_data[DATA_STATS]
+    stats.count(STAT_STATE_EVENTS)
+    state: State | None = event.data.get("new_state")
+    if state is None:
+        return
+    optimistic: dict[str, CALLBACK_TYPE] = entry_data[DATA_OPTIMISTIC]
+    if render_fingerprint(event.data.get("old_state")) == render_fingerprint(
+        state
+    ) and optimistic.keys().isdisjoint(uuids):
+        # Only attributes the icons don't show have changed
+        stats.count(STAT_STATE_EVENTS_SKIPPED)
+        return
+
+    stats.redraws[entity_id] += len(uuids)
+    for uuid in uuids:
+        # Real state replaces the expected state
+        unsub = optimistic.pop(uuid, None)
+        if unsub is not None:
+            unsub()
+        button = StreamDeckButton.get_button(hass, entry_id, uuid)
+        if button is not None:
+            button.update_icon()
+
+
+@callback
+def call_service(
+    hass: HomeAssistant,
+    entry_id: str,
+    domain: str,
+    service: str,
+    service_data: dict | None = None,
+    target: dict | None = None,
+    pressed_at: float | None = None,
+):
+    """Call a service without waiting for it and record the press latency."""
+    stats: StreamDeckStats = hass.data[DOMAIN][entry_id][DATA_STATS]
+    if pressed_at is None:
+        pressed_at = stats.press_started
+
+    async def async_call():
+        await hass.services.async_call(
+            domain, service, service_data=service_data, target=target
+        )
+        if pressed_at is not None:
+            stats.record(STAT_PRESS_LATENCY, time.monotonic() - pressed_at)
+
+    hass.async_create_task(async_call())
+
+
+@callback
+def send_adjustment(hass: HomeAssistant, entry_id: str, entity_id: str, _now=None):
+    """Send the accumulated value of PLUS and MINUS presses."""
+    entry_data = hass.data[DOMAIN].get(entry_id)
+    if not isinstance(entry_data, dict):
+        return
+    adjustment: PendingAdjustment | None = entry_data[DATA_ADJUSTMENTS].get(entity_id)
+    if adjustment is None:
+        return
+    adjustment.unsub = None
+    adjustment.commanded_at = time.monotonic()
+    call_service(
+        hass,
+        entry_id,
+        adjustment.domain,
+        adjustment.service,
+        service_data={adjustment.attribute: adjustment.value},
+        target={CONF_ENTITY_ID: entity_id},
+        pressed_at=adjustment.pressed_at,
+    )
+
+
+@callback
+def start_hold(hass: HomeAssistant, entry_id: str, uuid: str):
+    """Start repeating a PLUS or MINUS button after it is held for a moment."""
+    entry_data = hass.data[DOMAIN][entry_id]
+    button = StreamDeckButton.get_button(hass, entry_id, uuid)
+    if button is None or button.get_type() not in (
+        ButtonType.PLUS_BUTTON,
+        ButtonType.MINUS_BUTTON,
+    ):
+        return
+    stop_hold(hass, entry_id, uuid)
+    entry_data[DATA_HOLDS].pop(uuid, None)
+
+    hold = ButtonHold()
+
+    @callback
+    def step(_now=None):
+        hold.steps += 1
+        button.button_pressed()
+
+    @callback
+    def start_repeat(_now=None):
+        step()
+        hold.unsub = async_track_time_interval(
+            hass, step, timedelta(seconds=HOLD_STEP_INTERVAL)
+        )
+
+    hold.unsub = async_call_later(hass, HOLD_DELAY, start_repeat)
+    entry_data[DATA_HOLDS][uuid] = hold
+
+
+@callback
+def stop_hold(hass: HomeAssistant, entry_id: str, uuid: str):
+    """Stop repeating a PLUS or MINUS button."""
+    holds: dict[str, ButtonHold | bool] = hass.data[DOMAIN][entry_id][DATA_HOLDS]
+    hold = holds.get(uuid)
+    if not isinstance(hold, ButtonHold):
+        return
+    if hold.unsub is not None:
+        hold.unsub()
+        hold.unsub = None
+    if hold.steps > 0:
+        # Remember to ignore the tap sent on release
+        holds[uuid] = True
+    else:
+        holds.pop(uuid)
+
+
+def render_fingerprint(state: State | None) -> tuple | None:
+    """Get the parts of a state shown on button icons."""
+    if state is None:
+        return None
+    attributes = state.attributes
+    return (
+        state.state,
+        attributes.get(ATTR_ICON),
+        state.name,
+        attributes.get(ATTR_UNIT_OF_MEASUREMENT),
+        attributes.get(CONF_BRIGHTNESS),
+        attributes.get(ATTR_TEMPERATURE),
+        attributes.get(ATTR_MEDIA_VOLUME_LEVEL),
+    )
+
+
+def show_expected_state(hass: HomeAssistant, entry_id: str, state: State):
+    """Show the expected state of an entity after a toggle on its buttons."""
+    if state.state == STATE_ON:
+        expected_state = STATE_OFF
+    elif state.state == STATE_OFF:
+        expected_state = STATE_ON
+    else:
+        return
+    attributes = dict(state.attributes)
+    if expected_state == STATE_OFF:
+        attributes.pop(CONF_BRIGHTNESS, None)
+    expected = State(state.entity_id, expected_state, attributes)
+
+    entry_data = hass.data[DOMAIN][entry_id]
+    optimistic: dict[str, CALLBACK_TYPE] = entry_data[DATA_OPTIMISTIC]
+
+    @callback
+    def rollback(uuid: str, _now=None):
+        # Real state didn't arrive in time, show it again
+        optimistic.pop(uuid, None)
+        button = StreamDeckButton.get_button(hass, entry_id, uuid)
+        if button is not None:
+            button.update_icon()
+
+    for uuid in entry_data[DATA_ENTITY_INDEX].get(state.entity_id, ()):
+        button = StreamDeckButton.get_button(hass, entry_id, uuid)
+        if button is None:
+            continue
+        svg = button.render_icon(expected)
+        if svg is None:
+            continue
+        button.push_icon(svg)
+        unsub = optimistic.pop(uuid, None)
+        if unsub is not None:
+            unsub()
+        optimistic[uuid] = async_call_later(
+            hass, OPTIMISTIC_TIMEOUT, partial(rollback, uuid)
+        )
+
+
+def update_entity_index(hass: HomeAssistant, entry_id: str):
+    """Rebuild the entity_id to button uuids index of a config entry."""
+    entry_data = hass.data[DOMAIN].get(entry_id)
+    if not isinstance(entry_data, dict):
+        return
+
+    buttons: dict[str, StreamDeckButton] = entry_data[DATA_BUTTONS]
+    index: dict[str, set[str]] = {}
+    modifier_buttons: set[str] = set()
+    for uuid, button in buttons.items():
+        # PLUS and MINUS buttons follow the current entity
+        if button.get_type() in (ButtonType.PLUS_BUTTON, ButtonType.MINUS_BUTTON):
+            modifier_buttons.add(uuid)
+            continue
+        entity = button.get_entity()
+        if not isinstance(entity, str) or entity == "":
+            continue
+        index.setdefault(entity, set()).add(uuid)
+
+    entry_data[DATA_ENTITY_INDEX] = index
+    entry_data[DATA_MODIFIER_BUTTONS] = modifier_buttons
+    track_bound_entities(hass, entry_id)
+
+
+def track_bound_entities(hass: HomeAssistant, entry_id: str):
+    """Subscribe to state changes of all entities bound to buttons."""
+    entry_data = hass.data[DOMAIN].get(entry_id)
+    if not isinstance(entry_data, dict):
+        return
+
+    entities = set(entry_data[DATA_ENTITY_INDEX])
+    current_entity = entry_data[DATA_CURRENT_ENTITY]
+    if len(entry_data[DATA_MODIFIER_BUTTONS]) > 0 and isinstance(current_entity, str):
+        entities.add(current_entity)
+
+    # Re-arm state change subscription if the bound entities changed
+    if (
+        entities == entry_data[DATA_TRACKED_ENTITIES]
+        and entry_data.get(DATA_STATE_UNSUB) is not None
+    ):
+        return
+    unsub = entry_data.pop(DATA_STATE_UNSUB, None)
+    if unsub is not None:
+        unsub()
+    entry_data[DATA_TRACKED_ENTITIES] = entities
+    if len(entities) == 0:
+        return
+    entry_data[DATA_STATE_UNSUB] = async_track_state_change_event(
+        hass, list(entities), partial(on_entity_state_change, hass, entry_id)
+    )
+
+
+def set_current_entity(hass: HomeAssistant, entry_id: str, entity: str):
+    """Set the entity controlled by PLUS and MINUS buttons."""
+    entry_data = hass.data[DOMAIN][entry_id]
+    if entry_data[DATA_CURRENT_ENTITY] == entity:
+        return
+    entry_data[DATA_CURRENT_ENTITY] = entity
+    _LOGGER.info("Set current button to %s", entity)
+    track_bound_entities(hass, entry_id)
+
+    # Only PLUS and MINUS buttons depend on the current entity
+    StreamDeckButton.update_modifier_button_icons(hass, entry_id)
+
+
+def track_enabled_platforms(hass: HomeAssistant, entry_id: str) -> bool:
+    """Track entities added to or removed from the enabled platforms.
+
+    Returns True if the tracked platforms changed.
+    """
+    entry_data = hass.data[DOMAIN].get(entry_id)
+    if not isinstance(entry_data, dict):
+        return False
+
     # Get config_entry
     loaded_entry = hass.config_entries.async_get_entry(entry_id)
     if loaded_entry is None:
-        return None
+        return False
+
+    platforms = loaded_entry.data.get(CONF_ENABLED_PLATFORMS, DEFAULT_PLATFORMS)
+    if (
+        entry_data.get(DATA_DOMAIN_UNSUB) is not None
+        and entry_data.get(DATA_TRACKED_PLATFORMS) == platforms
+    ):
+        return False
+
+    unsub = entry_data.pop(DATA_DOMAIN_UNSUB, None)
+    if unsub is not None:
+        unsub()
 
-    # Update select options
-    domain_data: dict = hass.data[DOMAIN]
-    entry_data = domain_data.get(entry_id)
+    @callback
+    def on_change(event: Event):
+        # Invalidate cached options, selects are updated after a cooldown
+        entry_data.pop(DATA_SELECT_OPTIONS, None)
+        debouncer: Debouncer = entry_data[DATA_SELECT_DEBOUNCER]
+        hass.async_create_task(debouncer.async_call())
+
+    unsub_added = async_track_state_added_domain(hass, platforms, on_change)
+    unsub_removed = async_track_state_removed_domain(hass, platforms, on_change)
+
+    def unsub_all():
+        unsub_added()
+        unsub_removed()
+
+    entry_data[DATA_DOMAIN_UNSUB] = unsub_all
+    entry_data[DATA_TRACKED_PLATFORMS] = platforms
+    return True
+
+
+@callback
+def schedule_save_buttons(hass: HomeAssistant, entry_id: str):
+    """Write buttons to the config entry after a delay."""
+    entry_data = hass.data[DOMAIN][entry_id]
+    if entry_data.get(DATA_SAVE_UNSUB) is not None:
+        return
+    entry_data[DATA_SAVE_UNSUB] = async_call_later(
+        hass, BUTTONS_SAVE_DELAY, callback(lambda _now: save_buttons(hass, entry_id))
+    )
+
+
+@callback
+def save_buttons(hass: HomeAssistant, entry_id: str):
+    """Write buttons to the config entry."""
+    entry_data = hass.data[DOMAIN].get(entry_id)
     if not isinstance(entry_data, dict):
         return
-    selects: list[StreamDeckSelect] = entry_data[DATA_SELECT_ENTITIES]
-    for select in selects:
-        asyncio.run_coroutine_threadsafe(
-            select.async_set_options(
-                SELECT_DEFAULT_OPTIONS
-                + hass.states.async_entity_ids(
-                    domain_filter=loaded_entry.data.get(
-                        CONF_ENABLED_PLATFORMS, DEFAULT_PLATFORMS
-                    )
-                )
-            ),
-            hass.loop,
-        )
+    unsub = entry_data.pop(DATA_SAVE_UNSUB, None)
+    if unsub is not None:
+        unsub()
+
+    # Get config_entry
+    loaded_entry = hass.config_entries.async_get_entry(entry_id)
+    if loaded_entry is None:
+        return
 
-    buttons = loaded_entry.data.get(CONF_BUTTONS)
-    if not isinstance(buttons, dict):
+    buttons: dict[str, StreamDeckButton] = entry_data[DATA_BUTTONS]
+    changed = hass.config_entries.async_update_entry(
+        loaded_entry,
+        data={
+            **loaded_entry.data,
+            **{
+                CONF_BUTTONS: {
+                    uuid: button.to_dict() for uuid, button in buttons.items()
+                }
+            },
+        },
+    )
+    if changed is False:
         _LOGGER.error(
-            "Method on_entity_state_change: Config entry %s has no data for 'buttons'",
+            "Method save_buttons: Config entry %s has not been changed",
             entry_id,
         )
-        return None
 
-    state = hass.states.get(entity_id)
-    if state is None:
+
+@callback
+def update_select_options(hass: HomeAssistant, entry_id: str):
+    """Update options of all select entities of a config entry."""
+    entry_data = hass.data[DOMAIN].get(entry_id)
+    if not isinstance(entry_data, dict):
         return
-    for _, button_config in buttons.items():
-        if not isinstance(button_config, dict):
-            continue
-        button = StreamDeckButton.from_dict(button_config, hass, entry_id)
-        if button.get_entity() == entity_id:
-            button.update_icon()
+
+    # Get config_entry
+    loaded_entry = hass.config_entries.async_get_entry(entry_id)
+    if loaded_entry is None:
+        return
+
+    options = get_select_options(hass, entry_id)
+    selects: list[StreamDeckSelect] = entry_data[DATA_SELECT_ENTITIES]
+    for select in selects:
+        hass.async_create_task(select.async_set_options(options))
+
+
+def get_select_options(hass: HomeAssistant, entry_id: str) -> list[str]:
+    """Get the (cached) select options of a config entry."""
+    entry_data = hass.data[DOMAIN].get(entry_id)
+    if not isinstance(entry_data, dict):
+        return SELECT_DEFAULT_OPTIONS
+
+    # Get config_entry
+    loaded_entry = hass.config_entries.async_get_entry(entry_id)
+    if loaded_entry is None:
+        return SELECT_DEFAULT_OPTIONS
+
+    # Options are cached per set of enabled platforms
+    platforms = tuple(loaded_entry.data.get(CONF_ENABLED_PLATFORMS, DEFAULT_PLATFORMS))
+    cached: tuple[tuple, list[str]] | None = entry_data.get(DATA_SELECT_OPTIONS)
+    if cached is not None and cached[0] == platforms:
+        return cached[1]
+
+    options = SELECT_DEFAULT_OPTIONS + hass.states.async_entity_ids(
+        domain_filter=platforms
+    )
+    entry_data[DATA_SELECT_OPTIONS] = (platforms, options)
+    return options
+
+
+def get_state_text(state: State) -> str:
+    """Get state text shown on entity buttons."""
+    if (
+        state.domain == Platform.LIGHT
+        and state.attributes.get(CONF_BRIGHTNESS) is not None
+    ):
+        brightness = state.attributes.get(CONF_BRIGHTNESS)
+        brightness_pct = int(math_map(brightness, 0, 255, 0, 100))
+        return f"{brightness_pct}%"
+    if (
+        state.domain == climate.DOMAIN
+        and state.attributes.get(ATTR_TEMPERATURE) is not None
+    ):
+        temperature = state.attributes.get(ATTR_TEMPERATURE)
+        return f"{temperature}°C"
+    if (
+        state.domain == Platform.MEDIA_PLAYER
+        and state.attributes.get(ATTR_MEDIA_VOLUME_LEVEL) is not None
+    ):
+        volume = state.attributes.get(ATTR_MEDIA_VOLUME_LEVEL)
+        volume_pct = int(math_map(volume, 0, 1, 0, 100))
+        return f"{volume_pct}%"
+    return f'{state.state}{state.attributes.get(ATTR_UNIT_OF_MEASUREMENT, "")}'
 
 
 # Copy of the arduino map() function (https://www.arduino.cc/reference/en/language/functions/math/map/)
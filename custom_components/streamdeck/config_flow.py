@@ -16,9 +16,15 @@ from .const import (
     AVAILABLE_PLATFORMS,
     CONF_BUTTONS,
     CONF_ENABLED_PLATFORMS,
+    CONF_OPTIMISTIC,
+    CONF_RASTERIZE,
+    CONF_REPEAT_RATE,
     CONF_SHOW_NAME,
     CONF_VERSION,
+    DEFAULT_OPTIMISTIC,
     DEFAULT_PLATFORMS,
+    DEFAULT_RASTERIZE,
+    DEFAULT_REPEAT_RATE,
     DOMAIN,
 )
 
@@ -30,10 +36,23 @@ class StreamDeckConfigFlow(ConfigFlow, domain=DOMAIN):
 
     host: str | None = None
     unique_id: str | None = None
+    _api: StreamDeckApi | None = None
+    _info: SDInfo | None = None
+    _info_fetched: bool = False
+
+    async def _get_info(self) -> SDInfo | None:
+        """Get info of the current host, only asking the deck once."""
+        if self._api is None or self._api.host != self.host:
+            self._api = StreamDeckApi(self.host)
+            self._info_fetched = False
+        if not self._info_fetched:
+            info = await self._api.get_info()
+            self._info = info if isinstance(info, SDInfo) else None
+            self._info_fetched = True
+        return self._info
 
     async def _get_unique_id(self) -> SDInfo | None:
-        deck = StreamDeckApi(self.host)
-        info = await deck.get_info()
+        info = await self._get_info()
         if not isinstance(info, SDInfo) or len(info.devices) == 0:
             self.unique_id = self.host
             return None
@@ -91,13 +110,14 @@ class StreamDeckConfigFlow(ConfigFlow, domain=DOMAIN):
             self.host = user_input.get(CONF_HOST, "")
             if not isinstance(self.host, str):
                 raise ValueError("Unknown type for host")
+            # Ask the deck again on every submission
+            self._info_fetched = False
             await self._get_unique_id()
             _LOGGER.info("Host %s has unique_id %s", self.host, self.unique_id)
 
         errors: dict[str, str] = {}
         if self.host is not None and self.unique_id is not None:
-            deck = StreamDeckApi(self.host)
-            info = await deck.get_info()
+            info = await self._get_info()
 
             if not isinstance(info, SDInfo):
                 errors["base"] = "cannot_connect"
@@ -126,8 +146,6 @@ class StreamDeckConfigFlow(ConfigFlow, domain=DOMAIN):
                     errors=errors,
                 )
 
-            await self._get_unique_id()
-
             if user_input is not None:
                 # Create config_entry
                 data = {
@@ -195,6 +213,9 @@ class OptionsFlowHandler(OptionsFlow):
                     **{
                         CONF_SHOW_NAME: user_input[CONF_SHOW_NAME],
                         CONF_ENABLED_PLATFORMS: user_input[CONF_ENABLED_PLATFORMS],
+                        CONF_OPTIMISTIC: user_input[CONF_OPTIMISTIC],
+                        CONF_REPEAT_RATE: user_input[CONF_REPEAT_RATE],
+                        CONF_RASTERIZE: user_input[CONF_RASTERIZE],
                     },
                 },
             )
@@ -208,6 +229,9 @@ class OptionsFlowHandler(OptionsFlow):
                 data={
                     CONF_SHOW_NAME: user_input[CONF_SHOW_NAME],
                     CONF_ENABLED_PLATFORMS: user_input[CONF_ENABLED_PLATFORMS],
+                    CONF_OPTIMISTIC: user_input[CONF_OPTIMISTIC],
+                    CONF_REPEAT_RATE: user_input[CONF_REPEAT_RATE],
+                    CONF_RASTERIZE: user_input[CONF_RASTERIZE],
                 },
             )
 
@@ -231,6 +255,31 @@ class OptionsFlowHandler(OptionsFlow):
                             mode=selector.SelectSelectorMode.LIST,
                         )
                     ),
+                    vol.Required(
+                        CONF_OPTIMISTIC,
+                        default=self.config_entry.data.get(
+                            CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC
+                        ),
+                    ): selector.BooleanSelector(),
+                    vol.Required(
+                        CONF_REPEAT_RATE,
+                        default=self.config_entry.data.get(
+                            CONF_REPEAT_RATE, DEFAULT_REPEAT_RATE
+                        ),
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0.5,
+                            max=10,
+                            step=0.5,
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_RASTERIZE,
+                        default=self.config_entry.data.get(
+                            CONF_RASTERIZE, DEFAULT_RASTERIZE
+                        ),
+                    ): selector.BooleanSelector(),
                 }
             ),
         )
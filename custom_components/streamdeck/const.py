@@ -9,13 +9,36 @@ MANUFACTURER = "Elgato"
 # Data const
 DATA_API = "api"
 DATA_CURRENT_ENTITY = "current"
+DATA_BUTTONS = "buttons"
+DATA_INFO = "info"
+DATA_STATS = "stats"
+DATA_OPTIMISTIC = "optimistic_unsub"
+DATA_ADJUSTMENTS = "adjustments"
+DATA_HOLDS = "holds"
 DATA_SELECT_ENTITIES = "select"
+DATA_ENTITY_INDEX = "entity_index"
+DATA_MODIFIER_BUTTONS = "modifier_buttons"
+DATA_TRACKED_ENTITIES = "tracked_entities"
+DATA_STATE_UNSUB = "state_unsub"
+DATA_DOMAIN_UNSUB = "domain_unsub"
+DATA_TRACKED_PLATFORMS = "tracked_platforms"
+DATA_SAVE_UNSUB = "save_unsub"
+DATA_SELECT_OPTIONS = "select_options"
+DATA_SELECT_DEBOUNCER = "select_debouncer"
+DATA_ICON_SCHEDULER = "icon_scheduler"
+DATA_SYNC_TASK = "sync_task"
+# Shared by all config entries, stored directly in hass.data
+DATA_RASTERIZER = "streamdeck_rasterizer"
 
 # Config entry const
 CONF_BUTTONS = "buttons"
 CONF_ENABLED_PLATFORMS = "enabled_platforms"
 CONF_VERSION = "version"
 CONF_SHOW_NAME = "show_name"
+CONF_LAST_INFO = "last_info"
+CONF_OPTIMISTIC = "optimistic"
+CONF_REPEAT_RATE = "repeat_rate"
+CONF_RASTERIZE = "rasterize"
 
 TOGGLEABLE_PLATFORMS = [
     climate.DOMAIN,
@@ -47,6 +70,11 @@ UP_DOWN_PLATFORMS = [climate.DOMAIN, Platform.LIGHT, Platform.MEDIA_PLAYER]
 LIGHT_UP_DOWN_STEPS = 15
 CLIMATE_UP_DOWN_STEPS = 5
 VOLUME_UP_DOWN_STEPS = 0.1
+ADJUST_WINDOW = 0.3
+ADJUST_MEMORY = 3
+HOLD_DELAY = 0.5
+HOLD_STEP_INTERVAL = 0.2
+DEFAULT_REPEAT_RATE = 2.0
 
 AVAILABLE_PLATFORMS: list[str] = TOGGLEABLE_PLATFORMS
 DEFAULT_PLATFORMS: list[str] = [climate.DOMAIN, Platform.LIGHT]
@@ -58,15 +86,77 @@ SELECT_DEFAULT_OPTIONS = [
     SELECT_OPTION_UP,
     SELECT_OPTION_DOWN,
 ]
+SELECT_OPTIONS_COOLDOWN = 1.0
+INFO_MAX_AGE = 30
+INFO_TIMEOUT = 10
+BUTTONS_SAVE_DELAY = 10
 
 EVENT_SHORT_PRESS = "singleTap"
 EVENT_LONG_PRESS = "longPress"
+EVENT_KEY_DOWN = "keyDown"
+EVENT_KEY_UP = "keyUp"
 
 MDI_PREFIX = "mdi:"
 MDI_DEFAULT = "mdi:help"
+MDI_CACHE_SIZE = 512
 
+ATTR_AVAILABLE = "available"
+ATTR_DECKS = "decks"
+ATTR_ENTRY_ID = "entry_id"
+ATTR_LATENCY = "latency"
 ATTR_POSITION = "position"
 ATTR_UUID = "uuid"
+ATTR_DURATION = "duration"
+ATTR_TOP = "top"
+ATTR_FILE = "file"
+ATTR_CALLS = "calls"
+ATTR_FUNCTIONS = "functions"
+
+PROFILE_DEFAULT_DURATION = 60
+PROFILE_MAX_DURATION = 3600
+PROFILE_DEFAULT_TOP = 20
+
+ICON_FLUSH_INTERVAL = 0.05
+ICON_MAX_IN_FLIGHT = 4
+ICON_UPLOAD_TIMEOUT = 5
+
+DEFAULT_RASTERIZE = False
+RASTER_CACHE_DIR = "streamdeck_icons"
+RASTER_CACHE_MAX_FILES = 2000
+RASTER_MEMORY_CACHE_SIZE = 256
+# Written images between two prunes of the cache directory
+RASTER_PRUNE_INTERVAL = 100
+# Native key size in pixels per device type of the Stream Deck SDK
+KEY_SIZE_DEFAULT = 72
+KEY_SIZES = {
+    1: 80,  # Mini
+    2: 96,  # XL
+    7: 120,  # Stream Deck +
+}
+# The Stream Deck API server reports the device name instead
+KEY_SIZES_BY_NAME = {
+    "Mini": 80,
+    "XL": 96,
+    "Neo": 96,
+    "+": 120,
+}
+
+DEFAULT_OPTIMISTIC = True
+OPTIMISTIC_TIMEOUT = 5
+
+STATS_MAX_SAMPLES = 500
+STAT_PRESS_LATENCY = "press_latency"
+STAT_STATE_EVENTS = "state_events"
+STAT_STATE_EVENTS_SKIPPED = "state_events_skipped"
+STAT_ICONS_RENDERED = "icons_rendered"
+STAT_ICONS_PUSHED = "icons_pushed"
+STAT_RENDER_TIME = "render_time"
+STAT_WS_CONNECTS = "ws_connects"
+STAT_UPLOAD_TIME = "upload_time"
+STAT_INFO_TIME = "info_time"
+# Upper bounds of histogram buckets in milliseconds
+HISTOGRAM_BUCKETS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+SENSOR_UPDATE_INTERVAL = 30
 
 COLOR_ON = "#ffc107"
 COLOR_OFF = "#44739e"
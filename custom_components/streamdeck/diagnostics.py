@@ -0,0 +1,84 @@
+"""Diagnostics support for Stream Deck Integration."""
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST, CONF_UNIQUE_ID
+from homeassistant.core import HomeAssistant
+
+from . import StreamDeckIconScheduler, StreamDeckStats, info_layout, mdi_cache_info
+from .const import (
+    CONF_BUTTONS,
+    CONF_LAST_INFO,
+    DATA_ICON_SCHEDULER,
+    DATA_INFO,
+    DATA_STATS,
+    DOMAIN,
+    STAT_INFO_TIME,
+    STAT_PRESS_LATENCY,
+    STAT_RENDER_TIME,
+    STAT_UPLOAD_TIME,
+)
+
+# Host and serial numbers of the decks
+TO_REDACT = {CONF_HOST, CONF_UNIQUE_ID, "id", "device"}
+TOP_REDRAWS = 25
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    data = {
+        key: value
+        for key, value in entry.data.items()
+        if key not in (CONF_BUTTONS, CONF_LAST_INFO)
+    }
+    diagnostics: dict[str, Any] = {
+        "entry": async_redact_data(data, TO_REDACT),
+        CONF_BUTTONS: async_redact_data(entry.data.get(CONF_BUTTONS, {}), TO_REDACT),
+    }
+
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if not isinstance(entry_data, dict):
+        # Not loaded, only the stored layout is known
+        diagnostics["info"] = async_redact_data(
+            entry.data.get(CONF_LAST_INFO), TO_REDACT
+        )
+        return diagnostics
+
+    info = entry.data.get(CONF_LAST_INFO)
+    info_age: float | None = None
+    if DATA_INFO in entry_data:
+        fetched_at, last_info = entry_data[DATA_INFO]
+        info = info_layout(last_info)
+        info_age = round(time.monotonic() - fetched_at, 1)
+    diagnostics["info"] = async_redact_data(info, TO_REDACT)
+    diagnostics["info_age"] = info_age
+
+    stats: StreamDeckStats = entry_data[DATA_STATS]
+    scheduler: StreamDeckIconScheduler = entry_data[DATA_ICON_SCHEDULER]
+    diagnostics["stats"] = {
+        "uptime": round(time.monotonic() - stats.started, 1),
+        "counters": dict(stats.counters),
+        "histograms": {
+            "update_icon": stats.histogram(STAT_RENDER_TIME),
+            "icon_upload": stats.histogram(STAT_UPLOAD_TIME),
+            "get_info": stats.histogram(STAT_INFO_TIME),
+            "press_latency": stats.histogram(STAT_PRESS_LATENCY),
+        },
+        "ws_events": dict(stats.ws_events),
+        "ws_events_per_minute": stats.ws_event_rates(),
+        "redraws_by_entity": dict(stats.redraws.most_common(TOP_REDRAWS)),
+        "upload_queue": scheduler.queue_depth,
+        "mdi_cache": mdi_cache_info(),
+        "raster_cache_hit_ratio": (
+            scheduler.rasterizer.hit_ratio()
+            if scheduler.rasterizer is not None
+            else None
+        ),
+    }
+    return diagnostics
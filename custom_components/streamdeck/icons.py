@@ -0,0 +1,137 @@
+"""SVG icons for Stream Deck buttons.
+
+Each layout is a single f-string without whitespace between the tags, so the
+static parts are joined when the module is compiled and the icons sent to the
+deck stay small.
+"""
+from __future__ import annotations
+
+
+def render_unbound(line1: str, line2: str, line3: str) -> str:
+    """Render icon of a button without entity."""
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">'
+        f'<rect width="72" height="72" fill="#a00" />'
+        f'<text text-anchor="middle" x="35" y="20" fill="#fff" font-size="13">{line1}</text>'
+        f'<text text-anchor="middle" x="35" y="40" fill="#fff" font-size="13">{line2}</text>'
+        f'<text text-anchor="middle" x="35" y="60" fill="#fff" font-size="13">{line3}</text>'
+        f"</svg>"
+    )
+
+
+#
+#   Plus and Minus buttons without entity
+#
+
+
+def render_plus_initial(color: str) -> str:
+    """Render Plus button without entity."""
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">'
+        f'<rect width="72" height="72" fill="#000" />'
+        f'<rect x="10" y="10" width="52" height="52" fill="{color}" rx="5" />'
+        f'<rect x="15" y="31" width="42" height="10" fill="#000" />'
+        f'<rect x="31" y="15" width="10" height="42" fill="#000" />'
+        f"</svg>"
+    )
+
+
+def render_minus_initial(color: str) -> str:
+    """Render Minus button without entity."""
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">'
+        f'<rect width="72" height="72" fill="#000" />'
+        f'<rect x="10" y="10" width="52" height="52" fill="{color}" rx="5" />'
+        f'<rect x="15" y="31" width="42" height="10" fill="#000" />'
+        f"</svg>"
+    )
+
+
+#
+#   Layouts with entity name
+#
+
+
+def render_plus_named(modifier_color: str, name: str, mdi: str) -> str:
+    """Render Plus button with entity name."""
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">'
+        f'<rect width="72" height="72" fill="#000" />'
+        f'<rect x="40" y="12" width="25" height="25" fill="{modifier_color}" rx="5" />'
+        f'<rect x="45" y="22" width="15" height="5" fill="#000" />'
+        f'<rect x="50" y="17" width="5" height="15" fill="#000" />'
+        f'<text text-anchor="middle" x="35" y="65" fill="#fff" font-size="12">{name}</text>'
+        f'<g transform="translate(14, 14) scale(0.5)">{mdi}</g>'
+        f"</svg>"
+    )
+
+
+def render_minus_named(modifier_color: str, name: str, mdi: str) -> str:
+    """Render Minus button with entity name."""
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">'
+        f'<rect width="72" height="72" fill="#000" />'
+        f'<rect x="40" y="12" width="25" height="25" fill="{modifier_color}" rx="5" />'
+        f'<rect x="45" y="22" width="15" height="5" fill="#000" />'
+        f'<text text-anchor="middle" x="35" y="65" fill="#fff" font-size="12">{name}</text>'
+        f'<g transform="translate(14, 14) scale(0.5)">{mdi}</g>'
+        f"</svg>"
+    )
+
+
+def render_entity_named(state_text: str, name: str, mdi: str) -> str:
+    """Render entity button with state and entity name."""
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">'
+        f'<rect width="72" height="72" fill="#000" />'
+        f'<text text-anchor="middle" x="35" y="15" fill="#fff" font-size="12">{state_text}</text>'
+        f'<text text-anchor="middle" x="35" y="65" fill="#fff" font-size="12">{name}</text>'
+        f'<g transform="translate(16, 12) scale(0.5)">{mdi}</g>'
+        f"</svg>"
+    )
+
+
+#
+#   Layouts with icon only
+#
+
+
+def render_plus(modifier_color: str, mdi: str) -> str:
+    """Render Plus button with icon only."""
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">'
+        f'<rect width="72" height="72" fill="#000" />'
+        f'<rect x="40" y="12" width="25" height="25" fill="{modifier_color}" rx="5" />'
+        f'<rect x="45" y="22" width="15" height="5" fill="#000" />'
+        f'<rect x="50" y="17" width="5" height="15" fill="#000" />'
+        f'<g transform="translate(10, 10) scale(0.7)">{mdi}</g>'
+        f"</svg>"
+    )
+
+
+def render_minus(modifier_color: str, mdi: str) -> str:
+    """Render Minus button with icon only."""
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">'
+        f'<rect width="72" height="72" fill="#000" />'
+        f'<rect x="40" y="12" width="25" height="25" fill="{modifier_color}" rx="5" />'
+        f'<rect x="45" y="22" width="15" height="5" fill="#000" />'
+        f'<g transform="translate(10, 10) scale(0.7)">{mdi}</g>'
+        f"</svg>"
+    )
+
+
+def render_entity(mdi: str) -> str:
+    """Render entity button with icon only."""
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 72 72">'
+        f'<rect width="72" height="72" fill="#000" />'
+        f'<g transform="translate(5, 0) scale(0.8)">{mdi}</g>'
+        f"</svg>"
+    )
+
+
+def unbound_icon(uuid: str) -> str:
+    """Render icon of a button without entity, showing its uuid."""
+    parts = uuid.split("-")
+    return render_unbound(parts[0], parts[1], parts[2])
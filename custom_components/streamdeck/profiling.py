@@ -0,0 +1,95 @@
+"""Profiling of the Stream Deck integration's hot paths."""
+from __future__ import annotations
+
+from collections.abc import Callable
+import cProfile
+from functools import wraps
+import pstats
+import time
+from typing import Any, TypeVar
+
+_FuncT = TypeVar("_FuncT", bound=Callable[..., Any])
+
+_session: ProfileSession | None = None
+
+
+class ProfileSession:
+    """Profiler which only runs inside the profiled functions.
+
+    Unlike a global profiler, the rest of Home Assistant runs at full speed.
+    """
+
+    def __init__(self) -> None:
+        """Init profile session."""
+        self.profiler = cProfile.Profile()
+        self.started = time.monotonic()
+        self.calls = 0
+        self._depth = 0
+
+    def runcall(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call function with the profiler enabled."""
+        if self._depth > 0:
+            # Called from another profiled function
+            return func(*args, **kwargs)
+        self.calls += 1
+        self._depth += 1
+        self.profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.profiler.disable()
+            self._depth -= 1
+
+    def write(self, path: str, top: int) -> list[dict[str, Any]]:
+        """Write pstats file and get the functions with the most own time.
+
+        Does blocking I/O, must run in the executor.
+        """
+        self.profiler.dump_stats(path)
+        stats = pstats.Stats(self.profiler)
+        functions = [
+            {
+                "function": f"{file}:{line}({name})",
+                "calls": calls,
+                "total_time": round(total_time, 6),
+                "cumulative_time": round(cumulative_time, 6),
+            }
+            for (file, line, name), (
+                _primitive_calls,
+                calls,
+                total_time,
+                cumulative_time,
+                _callers,
+            ) in stats.stats.items()  # type: ignore[attr-defined]
+        ]
+        functions.sort(key=lambda function: function["total_time"], reverse=True)
+        return functions[:top]
+
+
+def profiled(func: _FuncT) -> _FuncT:
+    """Profile function while a profile session is running."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        session = _session
+        if session is None:
+            return func(*args, **kwargs)
+        return session.runcall(func, *args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def start_session() -> ProfileSession | None:
+    """Start a profile session, None if one is already running."""
+    global _session  # pylint: disable=global-statement
+    if _session is not None:
+        return None
+    _session = ProfileSession()
+    return _session
+
+
+def stop_session() -> ProfileSession | None:
+    """Stop the running profile session."""
+    global _session  # pylint: disable=global-statement
+    session, _session = _session, None
+    return session
@@ -0,0 +1,162 @@
+"""Rasterization of Stream Deck icons."""
+from __future__ import annotations
+
+import base64
+from functools import lru_cache
+import hashlib
+import logging
+import os
+import tempfile
+
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    RASTER_CACHE_MAX_FILES,
+    RASTER_MEMORY_CACHE_SIZE,
+    RASTER_PRUNE_INTERVAL,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class IconRasterizer:
+    """Convert SVG icons to PNG images at the native key size.
+
+    The Stream Deck API only accepts SVG, so the PNG is sent embedded in an SVG
+    image, which is much cheaper for the deck host to draw than paths and text.
+    Results are cached on disk by content, so identical icons are only rasterized
+    once across buttons, decks and restarts.
+
+    All methods except `async_rasterize` do blocking I/O and must run in the
+    executor.
+    """
+
+    def __init__(
+        self, cache_dir: str, max_files: int = RASTER_CACHE_MAX_FILES
+    ) -> None:
+        """Init icon rasterizer."""
+        self.cache_dir = cache_dir
+        self.max_files = max_files
+        self.available: bool | None = None
+        self._svg2png = None
+        self.rasterized = 0
+        self._writes = 0
+        self.rasterize = lru_cache(maxsize=RASTER_MEMORY_CACHE_SIZE)(self._rasterize)
+
+    async def async_rasterize(
+        self, hass: HomeAssistant, svg: str, size: int
+    ) -> str | None:
+        """Rasterize icon in the executor, None if rasterizing is not possible."""
+        if self.available is False:
+            return None
+        return await hass.async_add_executor_job(self.rasterize, svg, size)
+
+    def setup(self) -> bool:
+        """Load cairosvg and prepare the cache directory."""
+        try:
+            # Optional, needs the cairo library on the host
+            from cairosvg import svg2png  # pylint: disable=import-outside-toplevel
+        except (ImportError, OSError) as error:
+            _LOGGER.warning(
+                "Method IconRasterizer.setup: cairosvg is not available (%s). Sending icons as SVG",
+                error,
+            )
+            self.available = False
+            return False
+        self._svg2png = svg2png
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError as error:
+            _LOGGER.warning(
+                "Method IconRasterizer.setup: Cannot create cache %s (%s)",
+                self.cache_dir,
+                error,
+            )
+        self.prune()
+        self.available = True
+        return True
+
+    def _rasterize(self, svg: str, size: int) -> str | None:
+        """Get icon as SVG with an embedded PNG image."""
+        if self.available is None:
+            self.setup()
+        if self.available is False:
+            return None
+
+        key = hashlib.sha256(f"{size}:{svg}".encode("utf-8")).hexdigest()
+        path = os.path.join(self.cache_dir, f"{key}.png")
+        try:
+            with open(path, "rb") as file:
+                png = file.read()
+            # Keep recently used images when pruning
+            os.utime(path)
+        except FileNotFoundError:
+            self.rasterized += 1
+            try:
+                png = self._svg2png(
+                    bytestring=svg.encode("utf-8"),
+                    output_width=size,
+                    output_height=size,
+                )
+            except Exception as error:  # pylint: disable=broad-except
+                _LOGGER.debug(
+                    "Method IconRasterizer.rasterize: Invalid icon (%s). Sending icon as SVG",
+                    error,
+                )
+                return None
+            self._write(path, png)
+
+        data = base64.b64encode(png).decode("ascii")
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" '
+            f'xmlns:xlink="http://www.w3.org/1999/xlink" '
+            f'width="{size}" height="{size}" viewBox="0 0 {size} {size}">'
+            f'<image width="{size}" height="{size}" '
+            f'xlink:href="data:image/png;base64,{data}" /></svg>'
+        )
+
+    def _write(self, path: str, png: bytes):
+        """Write image to the cache, concurrent writers may race for the same file."""
+        try:
+            with tempfile.NamedTemporaryFile(
+                dir=self.cache_dir, suffix=".tmp", delete=False
+            ) as file:
+                file.write(png)
+            os.replace(file.name, path)
+        except OSError as error:
+            _LOGGER.debug(
+                "Method IconRasterizer.rasterize: Cannot write cache (%s)", error
+            )
+            return
+        # Keep the cache bounded while running, not only on startup
+        self._writes += 1
+        if self._writes >= RASTER_PRUNE_INTERVAL:
+            self._writes = 0
+            self.prune()
+
+    def hit_ratio(self) -> float | None:
+        """Get ratio of icons served from the memory or disk cache."""
+        calls = self.rasterize.cache_info()
+        total = calls.hits + calls.misses
+        if total == 0:
+            return None
+        return 1 - self.rasterized / total
+
+    def prune(self):
+        """Remove least recently used images above the maximum number of files."""
+        try:
+            entries = [
+                entry
+                for entry in os.scandir(self.cache_dir)
+                if entry.is_file() and entry.name.endswith((".png", ".tmp"))
+            ]
+        except OSError:
+            return
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[: len(entries) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,195 @@
+"""Diagnostic Sensors for Stream Deck Integration."""
+
+from homeassistant.components.sensor import SensorStateClass
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import PERCENTAGE, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from . import (
+    StreamDeckIconScheduler,
+    StreamDeckPerformanceSensor,
+    StreamDeckStats,
+    device_info,
+    mdi_cache_info,
+)
+from .const import (
+    DATA_ICON_SCHEDULER,
+    DATA_STATS,
+    STAT_ICONS_PUSHED,
+    STAT_ICONS_RENDERED,
+    STAT_PRESS_LATENCY,
+    STAT_RENDER_TIME,
+    STAT_STATE_EVENTS,
+    STAT_STATE_EVENTS_SKIPPED,
+    STAT_WS_CONNECTS,
+)
+
+PARALLEL_UPDATES = 0
+
+
+def counter(name: str):
+    """Get value of a counter."""
+
+    def value(entry_data: dict) -> int:
+        stats: StreamDeckStats = entry_data[DATA_STATS]
+        return stats.counters.get(name, 0)
+
+    return value
+
+
+def percentile_ms(name: str, percent: float):
+    """Get percentile of a timing in milliseconds."""
+
+    def value(entry_data: dict) -> float | None:
+        stats: StreamDeckStats = entry_data[DATA_STATS]
+        seconds = stats.percentile(name, percent)
+        if seconds is None:
+            return None
+        return round(seconds * 1000, 2)
+
+    return value
+
+
+def state_events_handled(entry_data: dict) -> int:
+    """Get number of state changes which caused a redraw."""
+    stats: StreamDeckStats = entry_data[DATA_STATS]
+    return stats.counters.get(STAT_STATE_EVENTS, 0) - stats.counters.get(
+        STAT_STATE_EVENTS_SKIPPED, 0
+    )
+
+
+def mdi_hit_ratio(entry_data: dict) -> float | None:
+    """Get hit ratio of the MDI icon cache in percent."""
+    info = mdi_cache_info()
+    total = info["icon_hits"] + info["icon_misses"]
+    if total == 0:
+        return None
+    return round(info["icon_hits"] / total * 100, 1)
+
+
+def raster_hit_ratio(entry_data: dict) -> float | None:
+    """Get hit ratio of the rasterized icon cache in percent."""
+    scheduler: StreamDeckIconScheduler = entry_data[DATA_ICON_SCHEDULER]
+    if scheduler.rasterizer is None:
+        return None
+    ratio = scheduler.rasterizer.hit_ratio()
+    if ratio is None:
+        return None
+    return round(ratio * 100, 1)
+
+
+def queue_depth(entry_data: dict) -> int:
+    """Get number of icons waiting for upload."""
+    scheduler: StreamDeckIconScheduler = entry_data[DATA_ICON_SCHEDULER]
+    return scheduler.queue_depth
+
+
+def ws_reconnects(entry_data: dict) -> int:
+    """Get number of websocket reconnects."""
+    stats: StreamDeckStats = entry_data[DATA_STATS]
+    return max(stats.counters.get(STAT_WS_CONNECTS, 0) - 1, 0)
+
+
+# Key, name, value, unit, state class
+SENSORS = [
+    (
+        "state_events",
+        "State changes received",
+        counter(STAT_STATE_EVENTS),
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+    ),
+    (
+        "state_events_handled",
+        "State changes redrawn",
+        state_events_handled,
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+    ),
+    (
+        "icons_rendered",
+        "Icons rendered",
+        counter(STAT_ICONS_RENDERED),
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+    ),
+    (
+        "icons_pushed",
+        "Icons sent",
+        counter(STAT_ICONS_PUSHED),
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+    ),
+    (
+        "mdi_cache_hit_ratio",
+        "MDI icon cache hit ratio",
+        mdi_hit_ratio,
+        PERCENTAGE,
+        SensorStateClass.MEASUREMENT,
+    ),
+    (
+        "raster_cache_hit_ratio",
+        "Rasterized icon cache hit ratio",
+        raster_hit_ratio,
+        PERCENTAGE,
+        SensorStateClass.MEASUREMENT,
+    ),
+    (
+        "upload_queue",
+        "Icon upload queue",
+        queue_depth,
+        None,
+        SensorStateClass.MEASUREMENT,
+    ),
+    (
+        "render_time_p50",
+        "Render time p50",
+        percentile_ms(STAT_RENDER_TIME, 50),
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+    ),
+    (
+        "render_time_p95",
+        "Render time p95",
+        percentile_ms(STAT_RENDER_TIME, 95),
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+    ),
+    (
+        "press_latency_p50",
+        "Press latency p50",
+        percentile_ms(STAT_PRESS_LATENCY, 50),
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+    ),
+    (
+        "press_latency_p95",
+        "Press latency p95",
+        percentile_ms(STAT_PRESS_LATENCY, 95),
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+    ),
+    (
+        "ws_reconnects",
+        "Websocket reconnects",
+        ws_reconnects,
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+    ),
+]
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Set up Stream Deck diagnostic sensors."""
+    device = device_info(entry)
+    async_add_entities(
+        [
+            StreamDeckPerformanceSensor(
+                device, entry.entry_id, key, name, value_fn, unit, state_class
+            )
+            for key, name, value_fn, unit, state_class in SENSORS
+        ]
+    )
@@ -0,0 +1 @@
+"""Tests for the Stream Deck integration."""
@@ -0,0 +1,100 @@
+"""Fixtures for Stream Deck tests."""
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from streamdeckapi import SDInfo
+
+from homeassistant.const import CONF_HOST, CONF_MODEL, CONF_NAME, CONF_UNIQUE_ID
+
+from custom_components.streamdeck.const import (
+    CONF_BUTTONS,
+    CONF_ENABLED_PLATFORMS,
+    CONF_SHOW_NAME,
+    CONF_VERSION,
+    DOMAIN,
+)
+
+INFO = {
+    "application": {
+        "font": "",
+        "language": "en",
+        "platform": "linux",
+        "platformVersion": "",
+        "version": "0.0.13",
+    },
+    "devices": [
+        {
+            "id": "SERIAL",
+            "name": "Stream Deck Original",
+            "size": {"columns": 3, "rows": 1},
+            "type": 20,
+        }
+    ],
+    "buttons": {
+        uuid: {
+            "uuid": uuid,
+            "device": "SERIAL",
+            "position": {"x": x, "y": 0},
+            "svg": "",
+        }
+        for x, uuid in enumerate(("a-b-c", "d-e-f", "g-h-i"))
+    },
+}
+
+
+class FakeStreamDeckApi:
+    """Stream Deck API client without a Stream Deck."""
+
+    def __init__(self, host: str, on_ws_message=None, on_ws_connect=None) -> None:
+        """Init fake API client."""
+        self.host = host
+        self.on_ws_message = on_ws_message
+        self.on_ws_connect = on_ws_connect
+        self.running = False
+
+    async def get_info(self, in_executor: bool = True) -> SDInfo:
+        """Get info."""
+        return SDInfo(INFO)
+
+    def start_websocket_loop(self):
+        """Start the websocket client."""
+        self.running = True
+
+    def stop_websocket_loop(self):
+        """Stop the websocket client."""
+        self.running = False
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Enable custom integrations."""
+    yield
+
+
+@pytest.fixture
+def mock_api():
+    """Replace the Stream Deck API client."""
+    with patch("custom_components.streamdeck.StreamDeckApi", FakeStreamDeckApi):
+        yield
+
+
+@pytest.fixture
+def config_entry() -> MockConfigEntry:
+    """Config entry of a Stream Deck with one button bound to a light."""
+    return MockConfigEntry(
+        domain=DOMAIN,
+        title="Stream Deck at 127.0.0.1",
+        data={
+            CONF_NAME: "Stream Deck",
+            CONF_HOST: "127.0.0.1",
+            CONF_UNIQUE_ID: "SERIAL",
+            CONF_MODEL: "Stream Deck Original",
+            CONF_VERSION: "0.0.13",
+            CONF_SHOW_NAME: True,
+            CONF_ENABLED_PLATFORMS: ["light"],
+            CONF_BUTTONS: {
+                "a-b-c": {"uuid": "a-b-c", "button_type": 1, "entity": "light.desk"}
+            },
+        },
+    )
@@ -0,0 +1,97 @@
+"""Tests for setup and unload of the Stream Deck integration."""
+from datetime import timedelta
+
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.streamdeck.const import (
+    DATA_STATS,
+    DOMAIN,
+    STAT_STATE_EVENTS,
+    STAT_STATE_EVENTS_SKIPPED,
+)
+
+RELOADS = 100
+
+
+async def async_flush_delayed_saves(hass: HomeAssistant) -> None:
+    """Write delayed saves of the registries, they listen for the final write."""
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(minutes=5))
+    await hass.async_block_till_done()
+
+
+def tracked_state_callbacks(hass: HomeAssistant) -> int:
+    """Count callbacks waiting for state changes."""
+    return sum(
+        len(jobs)
+        for key in (
+            "track_state_change_callbacks",
+            "track_state_added_domain_callbacks",
+            "track_state_removed_domain_callbacks",
+        )
+        for jobs in hass.data.get(key, {}).values()
+    )
+
+
+async def test_reload_does_not_leak_listeners(
+    hass: HomeAssistant, mock_api, config_entry
+) -> None:
+    """Test that reloading the entry removes everything it registered."""
+    hass.states.async_set("light.desk", "off")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert config_entry.state is ConfigEntryState.LOADED
+    await async_flush_delayed_saves(hass)
+
+    listeners = hass.bus.async_listeners()
+    state_callbacks = tracked_state_callbacks(hass)
+    assert state_callbacks > 0
+
+    for _ in range(RELOADS):
+        assert await hass.config_entries.async_reload(config_entry.entry_id)
+        await hass.async_block_till_done()
+    await async_flush_delayed_saves(hass)
+
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert hass.bus.async_listeners() == listeners
+    assert tracked_state_callbacks(hass) == state_callbacks
+
+    # Bound entities are still tracked after the reloads
+    hass.states.async_set("light.desk", "on")
+    await hass.async_block_till_done()
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_state_change_redraws_bound_button(
+    hass: HomeAssistant, mock_api, config_entry
+) -> None:
+    """Test that only state changes shown on the icon redraw the button."""
+    hass.states.async_set("light.desk", "off")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    stats = hass.data[DOMAIN][config_entry.entry_id][DATA_STATS]
+
+    hass.states.async_set("light.desk", "on", {"brightness": 128})
+    await hass.async_block_till_done()
+    assert stats.counters[STAT_STATE_EVENTS] == 1
+    assert stats.counters.get(STAT_STATE_EVENTS_SKIPPED, 0) == 0
+    assert stats.redraws["light.desk"] == 1
+
+    # Color is not shown on the icon
+    hass.states.async_set(
+        "light.desk", "on", {"brightness": 128, "rgb_color": (255, 0, 0)}
+    )
+    await hass.async_block_till_done()
+    assert stats.counters[STAT_STATE_EVENTS] == 2
+    assert stats.counters[STAT_STATE_EVENTS_SKIPPED] == 1
+    assert stats.redraws["light.desk"] == 1
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    await hass.async_block_till_done()